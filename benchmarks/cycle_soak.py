@@ -0,0 +1,77 @@
+"""
+Interleaving cost and schedule quality of the cycle and soak program for
+growing zone counts. Quality is the program duration relative to the lower
+bound (total runtime, or the longest single zone including its soaks)
+
+    python benchmarks/cycle_soak.py [--seed N]
+"""
+
+import argparse
+import random
+import time
+
+from openwater.plugins.cycle_soak.interleave import ZoneCycles, interleave, lower_bound
+
+ZONE_COUNTS = [8, 32, 128, 1024, 8192]
+MASTER_GROUPS = 4
+
+
+def random_zones(count: int, rng: random.Random):
+    return [
+        ZoneCycles(
+            zone_id=i,
+            runtime=rng.randrange(300, 3600, 60),
+            cycle=rng.choice([180, 300, 420, 600]),
+            soak=rng.choice([900, 1200, 1800, 2700]),
+            masters=frozenset([1000 + i % MASTER_GROUPS]),
+        )
+        for i in range(count)
+    ]
+
+
+def master_switches(zones, cycles) -> int:
+    masters = {z.zone_id: z.masters for z in zones}
+    prev, res = None, 0
+    for cycle in cycles:
+        if cycle.zone_id is None:
+            prev = None
+            continue
+        if prev is not None and masters[cycle.zone_id] != prev:
+            res += 1
+        prev = masters[cycle.zone_id]
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(
+        "{:>6} {:>8} {:>10} {:>10} {:>7} {:>9} {:>9}".format(
+            "zones", "cycles", "duration", "bound", "ratio", "switches", "ms"
+        )
+    )
+    for count in ZONE_COUNTS:
+        zones = random_zones(count, rng)
+        start = time.perf_counter()
+        cycles = interleave(zones)
+        elapsed = time.perf_counter() - start
+        duration = cycles[-1].start + cycles[-1].duration
+        bound = lower_bound(zones)
+        print(
+            "{:>6} {:>8} {:>10} {:>10} {:>7.3f} {:>9} {:>9.2f}".format(
+                count,
+                sum(1 for c in cycles if c.zone_id is not None),
+                duration,
+                bound,
+                duration / bound,
+                master_switches(zones, cycles),
+                elapsed * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Latency of one shift register write against the fake_rpi backend, with every
+clock and data edge awaited as its own executor job (as writes used to be),
+with the whole shift-out run as one job in the GPIO thread, and as one
+transfer to a simulated SPI device. The blocking columns time the write
+routine alone, bit-banged or over SPI, and wire is the SPI clock time of a
+transfer at the default bus speed, which the simulated device does not spend
+
+    python benchmarks/shift_register.py [--writes N]
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fake_rpi import toggle_print
+
+from openwater.plugins.gpio import OWGpio
+from openwater.plugins.shift_register import ShiftRegister, SpiShiftRegister
+from openwater.plugins.shift_register.spi import SimulatedSpiDevice
+
+REGISTER_COUNTS = [8, 24, 64, 128, 256]
+DATA_PIN, CLOCK_PIN, OE_PIN, LATCH_PIN = 17, 27, 22, 23
+
+
+async def write_per_edge(sr: ShiftRegister) -> None:
+    g = sr.g
+    await g.async_low([sr.clock_pin, sr.latch_pin])
+    for reg in range(sr.num_regs):
+        await g.async_low(sr.clock_pin)
+        if 1 & (sr._reg_mask >> reg):
+            await g.async_high(sr.data_pin)
+        else:
+            await g.async_low(sr.data_pin)
+        await g.async_high(sr.clock_pin)
+    await g.async_high(sr.latch_pin)
+
+
+async def measure(write, sr: ShiftRegister, writes: int) -> float:
+    """Mean latency of a write in microseconds"""
+    start = time.perf_counter()
+    for i in range(writes):
+        sr._reg_mask = i
+        await write(sr)
+    return (time.perf_counter() - start) / writes * 1e6
+
+
+def measure_blocking(sr: ShiftRegister, writes: int) -> float:
+    """Mean time of the blocking write routine in microseconds"""
+    start = time.perf_counter()
+    for i in range(writes):
+        sr.write_registers(i)
+    return (time.perf_counter() - start) / writes * 1e6
+
+
+async def run(writes: int) -> None:
+    toggle_print(False)
+    ow = SimpleNamespace(event_loop=asyncio.get_running_loop())
+    gpio = OWGpio(ow)
+    gpio.set_output([DATA_PIN, CLOCK_PIN, OE_PIN, LATCH_PIN])
+
+    columns = ["regs", "hops", "edge us", "single us", "spi us"]
+    columns += ["bang write us", "spi write us", "wire us"]
+    print("{:>5} {:>5} {:>10} {:>10} {:>8} {:>14} {:>13} {:>8}".format(*columns))
+    for num_regs in REGISTER_COUNTS:
+        sr = ShiftRegister(ow, gpio, DATA_PIN, CLOCK_PIN, OE_PIN, LATCH_PIN, num_regs)
+        device = SimulatedSpiDevice(num_regs)
+        spi = SpiShiftRegister(ow, gpio, device, num_regs, OE_PIN)
+        print(
+            "{:>5} {:>5} {:>10.1f} {:>10.1f} {:>8.1f} {:>14.1f} {:>13.2f} {:>8.1f}".format(
+                num_regs,
+                3 * num_regs + 2,
+                await measure(write_per_edge, sr, writes),
+                await measure(ShiftRegister.async_write_registers, sr, writes),
+                await measure(SpiShiftRegister.async_write_registers, spi, writes),
+                measure_blocking(sr, writes),
+                measure_blocking(spi, writes),
+                device.wire_time((num_regs + 7) // 8) * 1e6,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.writes))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ CORE_PLUGINS = [
     "shift_register",
     "websocket",
     "basic_program",
+    "cycle_soak",
     "frontend",
 ]
 
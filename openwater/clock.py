@@ -0,0 +1,27 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class Clock:
+    """Source of wall clock time, injected into OpenWater as ow.clock"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class VirtualClock(Clock):
+    """
+    Wall clock derived from an event loop's monotonic time. Paired with a
+    virtual time event loop, time only moves when the loop has nothing to do
+    """
+
+    def __init__(
+        self, start: datetime, loop: Optional[asyncio.AbstractEventLoop] = None
+    ):
+        self._loop = loop or asyncio.get_event_loop()
+        self._start = start
+        self._t0 = self._loop.time()
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._loop.time() - self._t0)
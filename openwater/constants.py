@@ -6,16 +6,20 @@ STATUS_STOPPED = "STOPPED"
 # Event Type Constants
 # App
 EVENT_APP_STARTED = "APPLICATION_STARTED"
+EVENT_APP_STOPPING = "APPLICATION_STOPPING"
 # Timer
 EVENT_TIMER_TICK_MIN = "TIMER_TICK_MIN"
 EVENT_TIMER_TICK_SEC = "TIMER_TICK_SEC"
 # Schedules
 EVENT_SCHEDULE_STATE = "SCHEDULE_STATE"
+EVENT_FORECAST = "FORECAST"
 # Program
 EVENT_PROGRAM_STATE = "PROGRAM_STATE"
 EVENT_PROGRAM_COMPLETED = "PROGRAM_COMPLETED"
+EVENT_RUN_QUEUE = "RUN_QUEUE"
 # Zone
 EVENT_ZONE_STATE = "ZONE_STATE"
+EVENT_ZONE_UPDATED = "ZONE_UPDATED"
 # Plugins
 EVENT_PLUGIN_LOADED = "PLUGIN_LOADED"
 EVENT_PLUGINS_COMPLETE = "PLUGINS_COMPLETE"
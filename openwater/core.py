@@ -7,10 +7,12 @@ from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Callable, Dict, Optional, Union, Any, Awaitable, Coroutine
 
+from openwater.clock import Clock
 from openwater.constants import (
     STATUS_STARTING,
     STATUS_RUNNING,
     EVENT_APP_STARTED,
+    EVENT_APP_STOPPING,
     EVENT_TIMER_TICK_SEC,
     EVENT_TIMER_TICK_MIN,
 )
@@ -28,10 +30,11 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class OpenWater:
-    def __init__(self) -> None:
+    def __init__(self, clock: Optional[Clock] = None) -> None:
         self.data: dict = {}
         self.config: Optional[Dict] = None
         self.event_loop: AbstractEventLoop = asyncio.get_event_loop()
+        self.clock: Clock = clock or Clock()
         self.executor = ThreadPoolExecutor()
         self.bus: EventBus = EventBus(self)
         self.timer = Timer(self)
@@ -104,6 +107,7 @@ class OpenWater:
     def stop(self) -> None:
         self.event_loop.remove_signal_handler(signal.SIGTERM)
         self.event_loop.remove_signal_handler(signal.SIGINT)
+        self.bus.fire(EVENT_APP_STOPPING)
         self._stopped.set()
 
 
@@ -138,8 +142,14 @@ class EventBus:
         else:
             self._listeners[event_type] = [callback_]
 
+        if event_type == EVENT_TIMER_TICK_SEC:
+            self.ow.timer.wake()
+
         return stop_listening
 
+    def has_listeners(self, event_type: str) -> bool:
+        return bool(self._listeners.get(event_type))
+
     def listen_once(self, event: str, callback: Callable[[Event], Any]) -> None:
         def listener_wrapper(evt: Event) -> None:
             self.remove_listener(event, listener_wrapper)
@@ -161,15 +171,23 @@ class EventBus:
         if event not in self._listeners:
             return
 
-        evt = Event(self.ow, event, datetime.now(), data)
+        evt = Event(self.ow, event, self.ow.clock.now(), data)
 
-        for listener in self._listeners.get(event):
+        # listen_once listeners remove themselves while the event is fired
+        for listener in list(self._listeners.get(event)):
             self.ow.add_job(listener, evt)
 
 
 class Timer:
+    """
+    Fires second and minute ticks on whole seconds. While nothing listens for
+    second ticks the timer sleeps until the next minute, and is woken again
+    when a second tick listener is added
+    """
+
     def __init__(self, ow: OpenWater):
         self._ow = ow
+        self._wakeup: Optional[asyncio.Future] = None
         self._ow.bus.listen_once(EVENT_APP_STARTED, self.run)
 
     def second_tick(self, now: datetime) -> None:
@@ -178,16 +196,36 @@ class Timer:
     def minute_tick(self, now: datetime) -> None:
         self._ow.bus.fire(EVENT_TIMER_TICK_MIN, {"now": now})
 
+    @nonblocking
+    def wake(self, elapsed: bool = False) -> None:
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(elapsed)
+
+    async def sleep_until(self, dt: datetime) -> bool:
+        """Sleep until dt, returns False if woken early"""
+        delay = (dt - self._ow.clock.now()).total_seconds()
+        self._wakeup = self._ow.event_loop.create_future()
+        handle = self._ow.event_loop.call_later(delay, self.wake, True)
+        try:
+            return await self._wakeup
+        finally:
+            handle.cancel()
+            self._wakeup = None
+
     @nonblocking
     def run(self, _: Event) -> None:
         async def _run():
             while True:
-                now = datetime.now()
-                secs = now.microsecond / 10 ** 6
-                await asyncio.sleep(1 - secs)
-                now = datetime.now()
-                self.second_tick(now)
-                if now.second == 0:
-                    self.minute_tick(now)
+                now = self._ow.clock.now().replace(microsecond=0)
+                if self._ow.bus.has_listeners(EVENT_TIMER_TICK_SEC):
+                    tick = now + timedelta(seconds=1)
+                else:
+                    tick = now.replace(second=0) + timedelta(minutes=1)
+                if not await self.sleep_until(tick):
+                    continue
+                if self._ow.bus.has_listeners(EVENT_TIMER_TICK_SEC):
+                    self.second_tick(tick)
+                if tick.second == 0:
+                    self.minute_tick(tick)
 
         self._ow.add_job(_run)
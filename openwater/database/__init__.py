@@ -1,12 +1,20 @@
+import asyncio
 import logging
 from datetime import datetime
 from logging import LogRecord
-from typing import TYPE_CHECKING, List, Optional, Mapping, Any
+from typing import TYPE_CHECKING, List, Optional, Mapping, Any, AsyncGenerator
 
 from databases import Database
 from sqlalchemy import select
 
+from openwater.database.backup import BackupManager
+from openwater.database.metrics import (
+    InstrumentedDatabase,
+    QueryMetrics,
+    DEFAULT_SLOW_QUERY_MS,
+)
 from openwater.database.model import DBModel, log_entry
+from openwater.database.writer import DatabaseWriter, WriteFunc, DEFAULT_MAX_BATCH
 
 if TYPE_CHECKING:
     from openwater.core import OpenWater
@@ -17,20 +25,55 @@ DB_URL_OPT = "sqlalchemy.url"
 
 _LOGGER = logging.getLogger(__name__)
 
+# Loggers of the database stack, storing their records would log more
+_UNSTORED_LOGGERS = (__name__, "databases", "aiosqlite", "sqlalchemy")
+
 
 class OWDatabase:
     def __init__(self, ow: "OpenWater"):
         self.ow = ow
         self._database = Database(ow.config.get("db_url"))
+        self.metrics = QueryMetrics(
+            ow.config.get("db_slow_query_ms", DEFAULT_SLOW_QUERY_MS)
+        )
+        self._connection = InstrumentedDatabase(self._database, self.metrics)
+        self.writer = DatabaseWriter(
+            self._connection, ow.config.get("db_write_batch", DEFAULT_MAX_BATCH)
+        )
+        self.backups = BackupManager(ow, ow.config.get("db_url"))
 
     async def connect(self):
         await self._database.connect()
+        self.writer.start()
         self.ow.bus.fire("DB_CONNECTED")
 
     async def disconnect(self):
+        await self.writer.stop()
         await self._database.disconnect()
         self.ow.bus.fire("DB_DISCONNECTED")
 
+    async def execute_write(self, query: Any, values: Optional[dict] = None) -> Any:
+        """
+        Execute a mutating statement through the single writer queue
+        :param query: the statement to execute
+        :param values: statement values
+        :return: the statement result
+        """
+        if self.writer.in_writer():
+            return await self.connection.execute(query=query, values=values)
+        return await self.writer.execute(query, values)
+
+    async def write(self, func: WriteFunc) -> Any:
+        """
+        Run a unit of work in the writer task as a single atomic transaction
+        :param func: coroutine function called with the database connection
+        :return: the result of func
+        """
+        if self.writer.in_writer():
+            async with self.connection.transaction():
+                return await func(self.connection)
+        return await self.writer.run(func)
+
     async def list(
         self, table: DBModel, order_by: Any = None, limit: int = None
     ) -> List[Mapping]:
@@ -48,6 +91,32 @@ class OWDatabase:
             query = query.limit(limit)
         return await self.connection.fetch_all(query=query)
 
+    async def stream_pages(
+        self, table: DBModel, page_size: int = 500, after_id: int = 0
+    ) -> AsyncGenerator[List[Mapping], None]:
+        """
+        Page through a table in id order using keyset pagination, so only one
+        page of records is held in memory at a time
+        :param table: the target model table
+        :param page_size: max records per page
+        :param after_id: only return records with an id greater than this
+        :return: an async generator of record pages
+        """
+        last_id = after_id
+        while True:
+            query = (
+                select([table])
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(page_size)
+            )
+            rows = await self.connection.fetch_all(query=query)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
     async def get(self, table: DBModel, id_: int) -> Optional[Mapping]:
         """
         Get a single record by id from the provided table
@@ -66,7 +135,7 @@ class OWDatabase:
         :return: the id of the new record if successful, otherwise -1
         """
         try:
-            return await self.connection.execute(query=table.insert(), values=data)
+            return await self.execute_write(table.insert(), data)
         except Exception:
             return 0
 
@@ -78,7 +147,7 @@ class OWDatabase:
         :return: True if successful, otherwise False
         """
         query = table.update().where(table.c.id == data["id"])
-        res = await self.connection.execute(query=query, values=data)
+        res = await self.execute_write(query, data)
         return res != 0
 
     async def delete(self, table: DBModel, id_: int) -> bool:
@@ -90,7 +159,7 @@ class OWDatabase:
         """
         try:
             query = table.delete().where(table.c.id == id_)
-            res = await self.connection.execute(query=query)
+            res = await self.execute_write(query)
             return res != 0
         except Exception:
             return False
@@ -103,28 +172,49 @@ class OWDatabase:
         :return: Num row deleted, or -1 if an error occurs
         """
         try:
-            query = table.delete.where(where)
-            res = await self.connection.execute(query=query)
+            query = table.delete().where(where)
+            res = await self.execute_write(query)
             return res
         except Exception as e:
             _LOGGER.error(e)
             return -1
 
     @property
-    def connection(self) -> Database:
-        return self._database
+    def connection(self) -> InstrumentedDatabase:
+        return self._connection
 
 
 class DatabaseLoggingHandler(logging.Handler):
+    """
+    Stores log records through the database writer. Records of the database
+    stack itself are left out, so storing a record never logs another one
+    """
+
     def __init__(self, ow: "OpenWater", level=logging.NOTSET):
         super().__init__(level=level)
         self._ow: "OpenWater" = ow
 
     def emit(self, record: LogRecord) -> None:
+        if any(
+            record.name == name or record.name.startswith(name + ".")
+            for name in _UNSTORED_LOGGERS
+        ):
+            return
+        db = self._ow.db
+        if db is None or not db.writer.running:
+            return
         row = {
             "timestamp": datetime.fromtimestamp(record.created),
             "logger": record.name,
             "level": record.levelname,
             "msg": record.msg % record.args,
         }
-        self._ow.add_job(self._ow.db.insert(log_entry, row))
+        # Records may come from other threads, such as the GPIO worker
+        asyncio.run_coroutine_threadsafe(self._insert(row), self._ow.event_loop)
+
+    async def _insert(self, row: dict) -> None:
+        try:
+            await self._ow.db.insert(log_entry, row)
+        except RuntimeError:
+            # The writer stopped after the record was queued
+            pass
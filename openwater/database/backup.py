@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures.thread import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional
+
+from openwater.config import get_default_config_dir
+from openwater.constants import EVENT_TIMER_TICK_MIN
+from openwater.errors import OWError
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater, Event
+
+_LOGGER = logging.getLogger(__name__)
+
+BACKUP_PREFIX = "openwater-"
+BACKUP_SUFFIX = ".db"
+BACKUP_TIME_FORMAT = "%Y%m%d-%H%M%S"
+DEFAULT_BACKUP_DIR = "backups"
+DEFAULT_KEEP = 7
+DEFAULT_PAGES_PER_STEP = 64
+DEFAULT_STEP_SLEEP = 0.005
+
+
+class BackupException(OWError):
+    """Raised when a database backup cannot be created or read"""
+
+    pass
+
+
+def sqlite_path(db_url: Optional[str]) -> Optional[str]:
+    """Get the database file path from a sqlite url, or None for other databases"""
+    if not db_url or not db_url.startswith("sqlite:///"):
+        return None
+    path = db_url[len("sqlite:///") :]
+    return path if path and path != ":memory:" else None
+
+
+class BackupManager:
+    """
+    Creates consistent copies of a running SQLite database using the online
+    backup API. The copy runs in small page steps on a dedicated worker thread
+    so the event loop and any writers are never blocked for long
+    """
+
+    def __init__(self, ow: "OpenWater", db_url: str):
+        config = ow.config.get("backup") or {}
+        self._ow = ow
+        self.db_path = sqlite_path(db_url)
+        self.backup_dir = config.get(
+            "dir", os.path.join(get_default_config_dir(), DEFAULT_BACKUP_DIR)
+        )
+        self.interval = config.get("interval", 0)  # minutes, 0 disables
+        self.keep = config.get("keep", DEFAULT_KEEP)
+        self.pages_per_step = config.get("pages_per_step", DEFAULT_PAGES_PER_STEP)
+        self.step_sleep = config.get("step_sleep", DEFAULT_STEP_SLEEP)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ow-backup"
+        )
+        self._running: Optional[asyncio.Future] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.last_backup: Optional[str] = None
+        self.last_backup_at: Optional[datetime] = None
+        self.last_duration: float = 0.0
+        self.last_bytes: int = 0
+        self.last_pages: int = 0
+
+        if self.db_path and self.interval:
+            self._load_last_backup()
+            ow.bus.listen(EVENT_TIMER_TICK_MIN, self.check_schedule)
+
+    @property
+    def enabled(self) -> bool:
+        return self.db_path is not None
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None and not self._running.done()
+
+    async def check_schedule(self, event: "Event") -> None:
+        now: datetime = event.data["now"]
+        if self.running:
+            return
+        if self.last_backup_at is not None and now - self.last_backup_at < timedelta(
+            minutes=self.interval
+        ):
+            return
+        try:
+            await self.backup()
+        except BackupException as e:
+            _LOGGER.error("Scheduled backup failed: %s", e)
+
+    async def backup(self) -> dict:
+        """Run a backup, or wait for the one already in progress"""
+        if not self.enabled:
+            raise BackupException("Backups are only supported for sqlite databases")
+        if not self.running:
+            now = self._ow.clock.now()
+            name = "{}{}{}".format(
+                BACKUP_PREFIX, now.strftime(BACKUP_TIME_FORMAT), BACKUP_SUFFIX
+            )
+            loop = asyncio.get_event_loop()
+            self._running = loop.run_in_executor(
+                self._executor, self._run_backup, name, now
+            )
+        try:
+            return await asyncio.shield(self._running)
+        except Exception as e:
+            raise BackupException("Backup failed: {}".format(e))
+
+    async def list(self) -> List[dict]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._list_backups)
+
+    def path_for(self, name: str) -> str:
+        """Get the path of an existing backup file"""
+        if (
+            os.path.basename(name) != name
+            or not name.startswith(BACKUP_PREFIX)
+            or not name.endswith(BACKUP_SUFFIX)
+        ):
+            raise BackupException("Invalid backup name: {}".format(name))
+        path = os.path.join(self.backup_dir, name)
+        if not os.path.isfile(path):
+            raise BackupException("Backup not found: {}".format(name))
+        return path
+
+    def _run_backup(self, name: str, now: datetime) -> dict:
+        os.makedirs(self.backup_dir, exist_ok=True)
+        target = os.path.join(self.backup_dir, name)
+        partial = target + ".part"
+        start = time.monotonic()
+        pages = 0
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            nonlocal pages
+            pages = total
+            if remaining and self.step_sleep:
+                time.sleep(self.step_sleep)
+
+        try:
+            src = sqlite3.connect("file:{}?mode=ro".format(self.db_path), uri=True)
+            dst = sqlite3.connect(partial)
+            try:
+                src.backup(dst, pages=self.pages_per_step, progress=progress)
+            finally:
+                dst.close()
+                src.close()
+            os.replace(partial, target)
+        except Exception as e:
+            self.failures += 1
+            _LOGGER.error("Database backup failed: %s", e)
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        duration = time.monotonic() - start
+        size = os.path.getsize(target)
+        self.runs += 1
+        self.last_backup = name
+        self.last_backup_at = now
+        self.last_duration = duration
+        self.last_bytes = size
+        self.last_pages = pages
+        _LOGGER.info(
+            "Backed up database to %s (%d bytes in %.2f sec)", target, size, duration
+        )
+        self._prune()
+        return self._describe(target)
+
+    def _load_last_backup(self) -> None:
+        """Start the schedule from the newest existing backup, not from startup"""
+        try:
+            backups = self._list_backups()
+        except OSError as e:
+            _LOGGER.error("Unable to list backups in %s: %s", self.backup_dir, e)
+            return
+        if not backups:
+            return
+        newest = max(backups, key=lambda b: b["created"])
+        self.last_backup = newest["name"]
+        self.last_backup_at = newest["created"]
+
+    def _prune(self) -> None:
+        if not self.keep or self.keep < 0:
+            return
+        for backup in self._list_backups()[self.keep :]:
+            try:
+                os.remove(os.path.join(self.backup_dir, backup["name"]))
+                _LOGGER.debug("Removed old backup %s", backup["name"])
+            except OSError as e:
+                _LOGGER.error("Unable to remove old backup %s: %s", backup["name"], e)
+
+    def _list_backups(self) -> List[dict]:
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = [
+            n
+            for n in os.listdir(self.backup_dir)
+            if n.startswith(BACKUP_PREFIX) and n.endswith(BACKUP_SUFFIX)
+        ]
+        return [
+            self._describe(os.path.join(self.backup_dir, n))
+            for n in sorted(names, reverse=True)
+        ]
+
+    @staticmethod
+    def _describe(path: str) -> dict:
+        stat = os.stat(path)
+        return {
+            "name": os.path.basename(path),
+            "size": stat.st_size,
+            "created": datetime.fromtimestamp(stat.st_mtime),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "interval": self.interval,
+            "keep": self.keep,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_backup": self.last_backup,
+            "last_backup_at": self.last_backup_at,
+            "last_duration_sec": self.last_duration,
+            "last_bytes": self.last_bytes,
+            "last_pages": self.last_pages,
+            "bytes_per_sec": (
+                self.last_bytes / self.last_duration if self.last_duration else 0.0
+            ),
+        }
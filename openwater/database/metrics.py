@@ -0,0 +1,162 @@
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple, AsyncGenerator
+
+from databases import Database
+from sqlalchemy.sql import Delete, Insert, Select, Update
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 200
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for le, n in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += n
+            buckets[str(le)] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": self.sum,
+            "max_ms": self.max,
+            "avg_ms": self.sum / self.count if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+def describe_query(query: Any) -> Tuple[str, str]:
+    """Get the (table, operation) labels for a query"""
+    if isinstance(query, str):
+        return "raw", "raw"
+    if isinstance(query, Insert):
+        return query.table.name, "insert"
+    if isinstance(query, Update):
+        return query.table.name, "update"
+    if isinstance(query, Delete):
+        return query.table.name, "delete"
+    if isinstance(query, Select):
+        froms = query.froms
+        name = getattr(froms[0], "name", None) if froms else None
+        if name is None and froms:
+            name = getattr(getattr(froms[0], "left", None), "name", None)
+        return name or "unknown", "select"
+    return "unknown", type(query).__name__.lower()
+
+
+class QueryMetrics:
+    def __init__(self, slow_query_ms: float = DEFAULT_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = 0
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, query: Any, values: Any, elapsed_ms: float) -> None:
+        key = describe_query(query)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(elapsed_ms)
+
+        if self.slow_query_ms and elapsed_ms >= self.slow_query_ms:
+            self.slow_queries += 1
+            params = values
+            if params is None and not isinstance(query, str):
+                params = query.compile().params
+            _LOGGER.warning(
+                "Slow query on %s.%s took %.1f ms: %s params=%s",
+                key[0],
+                key[1],
+                elapsed_ms,
+                query,
+                params,
+            )
+
+    def to_dict(self) -> dict:
+        return {
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "queries": [
+                dict(table=table, operation=op, **hist.to_dict())
+                for (table, op), hist in sorted(self.histograms.items())
+            ],
+        }
+
+
+class InstrumentedDatabase:
+    """Proxy for a Database connection that times every query"""
+
+    def __init__(self, database: Database, metrics: QueryMetrics):
+        self._database = database
+        self.metrics = metrics
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._database, item)
+
+    async def fetch_all(self, query: Any, values: Optional[dict] = None) -> Any:
+        start = time.monotonic()
+        try:
+            return await self._database.fetch_all(query=query, values=values)
+        finally:
+            self._observe(query, values, start)
+
+    async def fetch_one(self, query: Any, values: Optional[dict] = None) -> Any:
+        start = time.monotonic()
+        try:
+            return await self._database.fetch_one(query=query, values=values)
+        finally:
+            self._observe(query, values, start)
+
+    async def fetch_val(
+        self, query: Any, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        start = time.monotonic()
+        try:
+            return await self._database.fetch_val(
+                query=query, values=values, column=column
+            )
+        finally:
+            self._observe(query, values, start)
+
+    async def execute(self, query: Any, values: Optional[dict] = None) -> Any:
+        start = time.monotonic()
+        try:
+            return await self._database.execute(query=query, values=values)
+        finally:
+            self._observe(query, values, start)
+
+    async def execute_many(self, query: Any, values: list) -> None:
+        start = time.monotonic()
+        try:
+            return await self._database.execute_many(query=query, values=values)
+        finally:
+            self._observe(query, None, start)
+
+    async def iterate(
+        self, query: Any, values: Optional[dict] = None
+    ) -> AsyncGenerator[Any, None]:
+        start = time.monotonic()
+        try:
+            async for row in self._database.iterate(query=query, values=values):
+                yield row
+        finally:
+            self._observe(query, values, start)
+
+    def _observe(self, query: Any, values: Any, start: float) -> None:
+        self.metrics.observe(query, values, (time.monotonic() - start) * 1000)
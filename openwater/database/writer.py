@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional, Union
+
+from databases import Database
+
+if TYPE_CHECKING:
+    from openwater.database.metrics import InstrumentedDatabase
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 50
+
+WriteFunc = Callable[[Database], Awaitable[Any]]
+
+
+class WriteCommand:
+    def __init__(self, func: WriteFunc, atomic: bool = False):
+        self.func = func
+        self.atomic = atomic
+        self.future: asyncio.Future = asyncio.get_event_loop().create_future()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class DatabaseWriter:
+    """
+    Funnels every mutation through a single ordered queue. One writer task
+    consumes the queue and groups adjacent commands into a shared transaction
+    """
+
+    def __init__(
+        self,
+        database: Union[Database, "InstrumentedDatabase"],
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        self._database = database
+        self._queue: "asyncio.Queue[Optional[WriteCommand]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.max_batch = max_batch
+        self.writes = 0
+        self.commits = 0
+        self.failed_commits = 0
+        self.max_queue_depth = 0
+        self.last_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self.total_commit_ms = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def in_writer(self) -> bool:
+        """True if called from within the writer task"""
+        return self._task is not None and asyncio.current_task() is self._task
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Drain pending writes and stop the writer task"""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def execute(self, query: Any, values: Optional[dict] = None) -> Any:
+        """Queue a single statement and wait for its result"""
+
+        async def _execute(db: Database) -> Any:
+            return await db.execute(query=query, values=values)
+
+        return await self._submit(WriteCommand(_execute))
+
+    async def run(self, func: WriteFunc) -> Any:
+        """
+        Queue a unit of work. func is awaited inside the writer task with the
+        writer connection and is rolled back on its own if it raises
+        """
+        return await self._submit(WriteCommand(func, atomic=True))
+
+    async def _submit(self, cmd: WriteCommand) -> Any:
+        if not self.running:
+            raise RuntimeError("Database writer is not running")
+        self._queue.put_nowait(cmd)
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return await cmd.future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            cmd = await self._queue.get()
+            if cmd is None:
+                break
+            batch: List[WriteCommand] = [cmd]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                nxt = self._queue.get_nowait()
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[WriteCommand]) -> None:
+        start = time.monotonic()
+        try:
+            async with self._database.transaction():
+                for cmd in batch:
+                    await self._apply(cmd)
+        except Exception as e:
+            self.failed_commits += 1
+            _LOGGER.error("Failed to commit %d queued writes: %s", len(batch), e)
+            for cmd in batch:
+                if not cmd.future.done():
+                    cmd.future.set_exception(e)
+            return
+
+        elapsed = (time.monotonic() - start) * 1000
+        self.commits += 1
+        self.writes += len(batch)
+        self.last_commit_ms = elapsed
+        self.total_commit_ms += elapsed
+        self.max_commit_ms = max(self.max_commit_ms, elapsed)
+
+        for cmd in batch:
+            if cmd.future.done():
+                continue
+            if cmd.error is not None:
+                cmd.future.set_exception(cmd.error)
+            else:
+                cmd.future.set_result(cmd.result)
+
+    async def _apply(self, cmd: WriteCommand) -> None:
+        try:
+            if cmd.atomic:
+                async with self._database.transaction():
+                    cmd.result = await cmd.func(self._database)
+            else:
+                cmd.result = await cmd.func(self._database)
+        except Exception as e:
+            cmd.error = e
+
+    def to_dict(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "writes": self.writes,
+            "commits": self.commits,
+            "failed_commits": self.failed_commits,
+            "last_commit_ms": self.last_commit_ms,
+            "max_commit_ms": self.max_commit_ms,
+            "avg_commit_ms": (
+                self.total_commit_ms / self.commits if self.commits else 0.0
+            ),
+        }
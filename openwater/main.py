@@ -28,6 +28,17 @@ def get_args() -> argparse.Namespace:
     parser.add_argument(
         "--mock-gpio", action="store_true", help="Mock RPi.GPIO module for development"
     )
+    parser.add_argument(
+        "--simulate",
+        type=float,
+        metavar="DAYS",
+        help="Simulate the configured schedules for DAYS days and print valve actions",
+    )
+    parser.add_argument(
+        "--simulate-from",
+        metavar="YYYY-MM-DD",
+        help="Start date for --simulate, defaults to now",
+    )
 
     return parser.parse_args()
 
@@ -61,6 +72,9 @@ async def run(args: argparse.Namespace) -> int:
         await test_db(ow)
         return 0
 
+    if args.simulate:
+        return await simulate(ow, args.simulate, args.simulate_from)
+
     if args.mock_gpio:
         import fake_rpi
 
@@ -71,6 +85,21 @@ async def run(args: argparse.Namespace) -> int:
     return exit_code
 
 
+async def simulate(ow, days: float, start: str = None) -> int:
+    from datetime import datetime
+
+    from openwater.simulation import Simulation, load_simulation_data, summarize
+
+    start_dt = datetime.fromisoformat(start) if start else datetime.now()
+    sim = Simulation(await load_simulation_data(ow), ow.config)
+    timeline = await ow.add_job(sim.run, start_dt, days)
+    for action in timeline:
+        print(action)
+    for zone_id, total in sorted(summarize(timeline).items()):
+        print("zone {}: open {}".format(zone_id, total))
+    return 0
+
+
 def main() -> int:
     root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     sys.path.insert(0, root_path)
@@ -1,7 +1,7 @@
-from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from openwater.program.model import BaseProgram
+from openwater.program.model import BaseProgram, ProgramStep
+from openwater.program.packing import pack_steps
 from openwater.utils.decorator import nonblocking
 
 if TYPE_CHECKING:
@@ -19,10 +19,40 @@ def setup_plugin(ow: "OpenWater", config: dict = {}):
 
 @nonblocking
 def create_program(ow: "OpenWater", data: dict) -> "BasicProgram":
-    return BasicProgram(id=data["id"], name=data["name"])
+    return BasicProgram(id=data["id"], name=data["name"], attrs=data.get("attrs"))
 
 
 class BasicProgram(BaseProgram):
+    """
+    Runs its steps in order. With a max_flow attr, steps run concurrently
+    instead, packed so the flow rates of the open zones stay within max_flow.
+    Steps without zones still separate the steps before and after them
+    """
+
+    ATTR_SCHEMA = {"max_flow": {"type": "number", "nullable": True, "min": 0}}
+
+    def __init__(self, id: int, name: str, attrs: Optional[dict] = None):
+        super().__init__(id=id, name=name)
+        self.attrs = attrs or {}
+        self._layout: Optional[List[Tuple[int, ProgramStep]]] = None
+
+    def to_dict(self) -> dict:
+        res = super().to_dict()
+        res["attrs"] = self.attrs
+        return res
+
+    def layout(self) -> List[Tuple[int, ProgramStep]]:
+        max_flow = self.attrs.get("max_flow")
+        if not max_flow:
+            return super().layout()
+        if self._layout is None:
+            self._layout = pack_steps(self.steps, max_flow)
+        return self._layout
+
+    def invalidate(self) -> None:
+        super().invalidate()
+        self._layout = None
+
     @staticmethod
     def program_type() -> str:
         return "Basic"
@@ -0,0 +1,126 @@
+import logging
+from typing import TYPE_CHECKING, List, Tuple
+
+from cerberus import Validator
+
+from openwater.errors import ProgramValidationException
+from openwater.plugins.cycle_soak.interleave import ZoneCycles, interleave
+from openwater.program.model import BaseProgram, ProgramStep
+from openwater.utils.decorator import nonblocking
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater
+
+_LOGGER = logging.getLogger(__name__)
+
+PROGRAM_TYPE_CYCLE_SOAK = "CycleSoak"
+
+ZONE_SCHEMA = {
+    "zone_id": {"type": "integer", "required": True},
+    "runtime": {"type": "integer", "required": True, "min": 1},
+    "cycle": {"type": "integer", "nullable": True, "min": 1},
+    "soak": {"type": "integer", "nullable": True, "min": 0},
+}
+
+ATTR_SCHEMA = {
+    "cycle": {"type": "integer", "required": True, "min": 1},
+    "soak": {"type": "integer", "required": True, "min": 0},
+    "zones": {
+        "type": "list",
+        "required": True,
+        "schema": {"type": "dict", "schema": ZONE_SCHEMA},
+    },
+}
+
+
+@nonblocking
+def setup_plugin(ow: "OpenWater", config: dict = {}):
+    ow.programs.registry.register_program_type(
+        PROGRAM_TYPE_CYCLE_SOAK, CycleSoakProgram, create_program
+    )
+
+
+@nonblocking
+def create_program(ow: "OpenWater", data: dict) -> "CycleSoakProgram":
+    v: Validator = Validator(ATTR_SCHEMA)
+    if not v.validate(data.get("attrs") or {}):
+        raise ProgramValidationException("CycleSoakProgram validation failed", v.errors)
+    return CycleSoakProgram(ow, id=data["id"], name=data["name"], attrs=data["attrs"])
+
+
+class CycleSoakProgram(BaseProgram):
+    """
+    Waters each zone for its total runtime in cycles no longer than its cycle
+    length, leaving at least its soak time between cycles so water can soak in
+    instead of running off. The cycles of all zones are interleaved into one
+    sequence of steps, so other zones water while a zone soaks
+    """
+
+    ATTR_SCHEMA = ATTR_SCHEMA
+
+    def __init__(self, ow: "OpenWater", id: int, name: str, attrs: dict):
+        super().__init__(id=id, name=name)
+        self._ow = ow
+        self.attrs = attrs
+
+    def to_dict(self) -> dict:
+        res = super().to_dict()
+        res["steps"] = []
+        res["cycles"] = [
+            {
+                "zone_id": step.zones[0].id if step.zones else None,
+                "duration": step.duration,
+            }
+            for step in self.steps
+        ]
+        res["attrs"] = self.attrs
+        return res
+
+    @BaseProgram.steps.getter
+    def steps(self) -> Tuple[ProgramStep, ...]:
+        if self._sorted_steps is None:
+            self._sorted_steps = tuple(self._build_steps())
+        return self._sorted_steps
+
+    def requirements(self) -> List[ZoneCycles]:
+        """Cycle and soak times of each zone, with program defaults applied"""
+        res = []
+        for entry in self.attrs["zones"]:
+            zone = self._ow.zones.store.get(entry["zone_id"])
+            if zone is None:
+                _LOGGER.warning(
+                    "Program %d references missing zone %d", self.id, entry["zone_id"]
+                )
+                continue
+            soak = entry.get("soak")
+            res.append(
+                ZoneCycles(
+                    zone_id=zone.id,
+                    runtime=entry["runtime"],
+                    cycle=entry.get("cycle") or self.attrs["cycle"],
+                    soak=self.attrs["soak"] if soak is None else soak,
+                    masters=frozenset(mz.id for mz in zone.master_zones or []),
+                )
+            )
+        return res
+
+    def _build_steps(self) -> List[ProgramStep]:
+        steps = []
+        for order, cycle in enumerate(interleave(self.requirements())):
+            zones = []
+            if cycle.zone_id is not None:
+                zones = [self._ow.zones.store.get(cycle.zone_id)]
+            steps.append(
+                ProgramStep(
+                    id=None,
+                    duration=cycle.duration,
+                    order=order,
+                    program_id=self.id,
+                    zones=zones,
+                )
+            )
+        return steps
+
+    @staticmethod
+    def program_type() -> str:
+        return PROGRAM_TYPE_CYCLE_SOAK
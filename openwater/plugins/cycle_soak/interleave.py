@@ -0,0 +1,98 @@
+import heapq
+import math
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class ZoneCycles(NamedTuple):
+    """Watering requirement of one zone, all times in seconds"""
+
+    zone_id: int
+    runtime: int
+    cycle: int
+    soak: int
+    masters: FrozenSet[int] = frozenset()
+
+    @property
+    def cycle_count(self) -> int:
+        return max(1, math.ceil(self.runtime / self.cycle))
+
+
+class Cycle(NamedTuple):
+    start: int
+    duration: int
+    zone_id: Optional[int] = None  # None while every remaining zone soaks
+
+
+def split_runtime(runtime: int, cycle: int) -> List[int]:
+    """Split a runtime into the fewest cycles of at most cycle, evenly sized"""
+    count = max(1, math.ceil(runtime / cycle))
+    base, extra = divmod(runtime, count)
+    return [base + 1] * extra + [base] * (count - extra)
+
+
+def lower_bound(zones: Sequence[ZoneCycles]) -> int:
+    """
+    No schedule is shorter than the total runtime, nor than any single zone's
+    runtime plus the soaks between its cycles
+    """
+    return max(
+        [sum(z.runtime for z in zones)]
+        + [z.runtime + (z.cycle_count - 1) * z.soak for z in zones]
+    )
+
+
+def interleave(zones: Sequence[ZoneCycles]) -> List[Cycle]:
+    """
+    Greedy list schedule of the cycles of every zone, one zone at a time.
+    Whenever the valve line is free, the ready zone with the longest remaining
+    critical path (its unwatered time plus the soaks it still needs) runs its
+    next cycle. Ties prefer a zone behind the same master zones as the previous
+    cycle, so masters are not cycled needlessly. When every zone with cycles
+    left is soaking, an idle gap lasts until the first soak ends.
+    Ready zones are kept in one heap per master group, so each cycle costs
+    O(log z + g) for z zones in g master groups
+    """
+    active = [z for z in zones if z.runtime > 0]
+    cycles = [split_runtime(z.runtime, z.cycle) for z in active]
+    remaining = [z.runtime for z in active]
+    position = [0] * len(active)
+
+    def tail(i: int) -> int:
+        return remaining[i] + (len(cycles[i]) - position[i] - 1) * active[i].soak
+
+    ready: Dict[FrozenSet[int], List[Tuple[int, int]]] = {}
+    for i, zone in enumerate(active):
+        ready.setdefault(zone.masters, []).append((-tail(i), i))
+    for group in ready.values():
+        heapq.heapify(group)
+    waiting = len(active)
+    soaking: List[Tuple[int, int]] = []
+    res: List[Cycle] = []
+    masters: FrozenSet[int] = frozenset()
+    t = 0
+    while waiting or soaking:
+        while soaking and soaking[0][0] <= t:
+            _, i = heapq.heappop(soaking)
+            heapq.heappush(ready[active[i].masters], (-tail(i), i))
+            waiting += 1
+        if not waiting:
+            resume = soaking[0][0]
+            res.append(Cycle(t, resume - t))
+            t = resume
+            continue
+
+        best = min((g for g in ready.values() if g), key=lambda g: g[0][0])
+        current = ready.get(masters)
+        if current and current[0][0] == best[0][0]:
+            best = current
+        _, i = heapq.heappop(best)
+        waiting -= 1
+        duration = cycles[i][position[i]]
+        res.append(Cycle(t, duration, active[i].zone_id))
+        t += duration
+        remaining[i] -= duration
+        position[i] += 1
+        masters = active[i].masters
+        if position[i] < len(cycles[i]):
+            heapq.heappush(soaking, (t + active[i].soak, i))
+    return res
@@ -7,7 +7,18 @@ except Exception:
 
 from fake_rpi.RPi import GPIO as gpio
 from fake_rpi import toggle_print
-from typing import TYPE_CHECKING, Optional, Union, Collection
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    Collection,
+)
+
+from openwater.plugins.gpio.worker import DEFAULT_THREAD_NAME, GpioWorker
 
 if TYPE_CHECKING:
     from openwater.core import OpenWater
@@ -18,34 +29,63 @@ DATA_GPIO = "GPIO"
 def setup_plugin(ow: "OpenWater", config: dict):
     toggle_print(False)
     ow.add_job(gpio.setmode, gpio.BCM)
-    ow.data[DATA_GPIO] = OWGpio(ow)
+    worker = GpioWorker(
+        ow.event_loop,
+        name=config.get("thread_name", DEFAULT_THREAD_NAME),
+        priority=config.get("priority"),
+    )
+    ow.data[DATA_GPIO] = OWGpio(ow, worker)
 
 
 class OWGpio:
-    def __init__(self, ow: "OpenWater"):
+    """
+    GPIO access. Async calls are queued to a GpioWorker, so pin changes are
+    applied in the order they were requested, in a thread of their own
+    """
+
+    def __init__(self, ow: "OpenWater", worker: Optional[GpioWorker] = None):
         self.ow = ow
+        self.worker = worker or GpioWorker(ow.event_loop)
         self.LOW = gpio.LOW
         self.HIGH = gpio.HIGH
         self.IN = gpio.IN
         self.OUT = gpio.OUT
 
+    @property
+    def metrics(self) -> dict:
+        return self.worker.to_dict()
+
+    async def run(self, func: Callable[..., Any], *args: Any, ops: int = 1) -> Any:
+        """Run a blocking routine of ops GPIO calls in the GPIO thread"""
+        return await self.worker.submit(func, *args, ops=ops)
+
+    def write(self, ops: Sequence[Tuple[Union[Collection[int], int], int]]) -> None:
+        for pin, state in ops:
+            gpio.output(pin, state)
+
+    async def async_write(
+        self, ops: Sequence[Tuple[Union[Collection[int], int], int]]
+    ) -> None:
+        """Apply a batch of (pin, state) outputs in order, as one command"""
+        await self.run(self.write, ops, ops=len(ops))
+
     def set_output(self, pin: Union[Collection[int], int]) -> None:
         gpio.setup(pin, self.OUT)
 
     async def async_set_output(self, pin: Union[Collection[int], int]) -> None:
-        await self.ow.add_job(gpio.setup, pin, self.OUT)
+        await self.run(gpio.setup, pin, self.OUT)
 
     def set_input(self, pin: Union[Collection[int], int]) -> None:
         gpio.setup(pin, self.IN)
 
     async def async_set_input(self, pin: Union[Collection[int], int]) -> None:
-        await self.ow.add_job(gpio.setup, pin, self.IN)
+        await self.run(gpio.setup, pin, self.IN)
 
     def output(self, pin: Union[Collection[int], int], state: int) -> None:
         gpio.output(pin, state)
 
     async def async_output(self, pin: Union[Collection[int], int], state: int) -> None:
-        await self.ow.add_job(gpio.output, pin, state)
+        await self.run(gpio.output, pin, state)
 
     def low(self, pin: Union[Collection[int], int]) -> None:
         self.output(pin, self.LOW)
@@ -63,4 +103,4 @@ class OWGpio:
         return gpio.input(pin, state)
 
     async def async_input(self, pin: int) -> asyncio.Future:
-        return await self.ow.add_job(gpio.input, pin)
+        return await self.run(gpio.input, pin)
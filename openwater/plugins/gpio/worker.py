@@ -0,0 +1,110 @@
+import logging
+import os
+import queue
+import threading
+import time
+from asyncio import AbstractEventLoop, Future
+from typing import Any, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_THREAD_NAME = "gpio"
+
+
+def _set_result(future: Future, result: Any) -> None:
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future: Future, exc: BaseException) -> None:
+    if not future.cancelled():
+        future.set_exception(exc)
+
+
+class GpioWorker:
+    """
+    Runs GPIO commands in one dedicated thread, strictly in the order they
+    were submitted. A command is a blocking callable doing one or more pin
+    operations, its result is delivered to a future on the event loop.
+    Counts commands and pin operations, and how long commands wait queued
+    """
+
+    def __init__(
+        self,
+        loop: AbstractEventLoop,
+        name: str = DEFAULT_THREAD_NAME,
+        priority: Optional[int] = None,
+    ):
+        self._loop = loop
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self.name = name
+        self.priority = priority
+        self.commands = 0
+        self.operations = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "thread": self.name,
+            "priority": self.priority,
+            "pending": self._queue.qsize(),
+            "commands": self.commands,
+            "operations": self.operations,
+            "errors": self.errors,
+            "wait_avg_ms": (
+                self.wait_total / self.commands * 1000 if self.commands else 0.0
+            ),
+            "wait_max_ms": self.wait_max * 1000,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread once every command already submitted has run"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread = None
+
+    def submit(self, func: Callable[..., Any], *args: Any, ops: int = 1) -> Future:
+        """Queue a command of ops pin operations, must be called from the loop"""
+        self.start()
+        future = self._loop.create_future()
+        self._queue.put((time.monotonic(), future, func, args, ops))
+        return future
+
+    def _run(self) -> None:
+        self._set_priority()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            queued, future, func, args, ops = item
+            wait = time.monotonic() - queued
+            self.commands += 1
+            self.operations += ops
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            try:
+                res = func(*args)
+            except Exception as e:
+                self.errors += 1
+                self._loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                self._loop.call_soon_threadsafe(_set_result, future, res)
+
+    def _set_priority(self) -> None:
+        if self.priority is None:
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.priority)
+        except (AttributeError, OSError) as e:
+            _LOGGER.warning(
+                "Could not set GPIO thread priority to %d: %s", self.priority, e
+            )
@@ -2,6 +2,11 @@ import logging
 from typing import Optional
 
 from openwater.database import DatabaseLoggingHandler
+from openwater.plugins.logger.buffer import (
+    DATA_LOG_BUFFER,
+    DEFAULT_CAPACITY,
+    RingBufferHandler,
+)
 
 _STR_TO_LEVEL = {
     "NONE": logging.NOTSET,
@@ -30,8 +35,15 @@ def setup_plugin(ow: "OpenWater", config: dict):
     hndlr = root.handlers[0]
     hndlr.setFormatter(formatter)
 
+    buffer_size = config.get("buffer_size", DEFAULT_CAPACITY)
+    if buffer_size:
+        buffer_handler = RingBufferHandler(buffer_size)
+        root.addHandler(buffer_handler)
+        ow.data[DATA_LOG_BUFFER] = buffer_handler
+
     if config.get("database", False) is True:
         db_handler = DatabaseLoggingHandler(ow)
+        db_handler.setLevel(get_level(config.get("database_level", "INFO")))
         root.addHandler(db_handler)
 
     for logger, level in config.get("loggers", {}).items():
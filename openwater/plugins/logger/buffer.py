@@ -0,0 +1,160 @@
+import heapq
+import logging
+from array import array
+from collections import deque
+from datetime import datetime
+from logging import LogRecord
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+DATA_LOG_BUFFER = "LOG_BUFFER"
+DEFAULT_CAPACITY = 2000
+DEFAULT_QUERY_LIMIT = 200
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last `capacity` records in fixed size parallel arrays. Records are
+    addressed by a monotonically increasing sequence number, slot = seq % capacity.
+    Per-level and per-logger deques of sequence numbers are kept in step with the
+    buffer so filtered queries only visit matching records. A logger id is freed
+    for reuse when its last record is overwritten
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, level=logging.NOTSET):
+        super().__init__(level=level)
+        self.capacity = capacity
+        self._created = array("d", [0.0]) * capacity
+        self._levels = array("H", [0]) * capacity
+        self._loggers = array("H", [0]) * capacity
+        self._messages: List[Optional[str]] = [None] * capacity
+        self._logger_names: List[Optional[str]] = []
+        self._logger_ids: Dict[str, int] = {}
+        self._free_ids: List[int] = []
+        self._by_level: Dict[int, Deque[int]] = {}
+        self._by_logger: Dict[int, Deque[int]] = {}
+        self._next = 0
+
+    @property
+    def oldest(self) -> int:
+        return max(0, self._next - self.capacity)
+
+    def __len__(self) -> int:
+        return self._next - self.oldest
+
+    def emit(self, record: LogRecord) -> None:
+        try:
+            msg = record.getMessage()
+            if record.exc_info:
+                msg = "{}\n{}".format(
+                    msg, logging.Formatter().formatException(record.exc_info)
+                )
+        except Exception:
+            self.handleError(record)
+            return
+
+        seq = self._next
+        slot = seq % self.capacity
+        if seq >= self.capacity:
+            self._by_level[self._levels[slot]].popleft()
+            old_id = self._loggers[slot]
+            self._by_logger[old_id].popleft()
+            if not self._by_logger[old_id]:
+                self._release_logger_id(old_id)
+
+        logger_id = self._logger_ids.get(record.name)
+        if logger_id is None:
+            logger_id = self._intern_logger(record.name)
+
+        self._created[slot] = record.created
+        self._levels[slot] = record.levelno
+        self._loggers[slot] = logger_id
+        self._messages[slot] = msg
+        self._by_level.setdefault(record.levelno, deque()).append(seq)
+        self._by_logger.setdefault(logger_id, deque()).append(seq)
+        self._next = seq + 1
+
+    def _intern_logger(self, name: str) -> int:
+        if self._free_ids:
+            logger_id = self._free_ids.pop()
+            self._logger_names[logger_id] = name
+        else:
+            logger_id = len(self._logger_names)
+            self._logger_names.append(name)
+        self._logger_ids[name] = logger_id
+        return logger_id
+
+    def _release_logger_id(self, logger_id: int) -> None:
+        del self._logger_ids[self._logger_names[logger_id]]
+        del self._by_logger[logger_id]
+        self._logger_names[logger_id] = None
+        self._free_ids.append(logger_id)
+
+    def query(
+        self,
+        level: Optional[int] = None,
+        logger: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = DEFAULT_QUERY_LIMIT,
+    ) -> List[dict]:
+        """
+        Get the newest matching records, returned oldest first
+        :param level: minimum level number
+        :param logger: logger name, also matches its child loggers
+        :param since: only return records created at or after this timestamp
+        :param limit: max records to return
+        """
+        self.acquire()
+        try:
+            first = self._first_since(since) if since is not None else self.oldest
+            res = []
+            for seq in self._candidates(level, logger):
+                if seq < first or len(res) >= limit:
+                    break
+                slot = seq % self.capacity
+                if level is not None and self._levels[slot] < level:
+                    continue
+                res.append(self._record(seq))
+        finally:
+            self.release()
+        res.reverse()
+        return res
+
+    def _candidates(self, level: Optional[int], logger: Optional[str]) -> Iterator[int]:
+        """Sequence numbers from the smallest matching index, newest first"""
+        if logger is not None:
+            prefix = logger + "."
+            ids = [
+                id_
+                for name, id_ in self._logger_ids.items()
+                if name == logger or name.startswith(prefix)
+            ]
+            return self._merge(self._by_logger.get(id_, ()) for id_ in ids)
+        if level is not None:
+            return self._merge(
+                seqs for lvl, seqs in self._by_level.items() if lvl >= level
+            )
+        return iter(range(self._next - 1, self.oldest - 1, -1))
+
+    @staticmethod
+    def _merge(indexes: Iterable[Iterable[int]]) -> Iterator[int]:
+        return heapq.merge(*[reversed(seqs) for seqs in indexes], reverse=True)
+
+    def _first_since(self, since: float) -> int:
+        lo, hi = self.oldest, self._next
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._created[mid % self.capacity] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _record(self, seq: int) -> dict:
+        slot = seq % self.capacity
+        return {
+            "seq": seq,
+            "timestamp": datetime.fromtimestamp(self._created[slot]),
+            "level": logging.getLevelName(self._levels[slot]),
+            "logger": self._logger_names[self._loggers[slot]],
+            "msg": self._messages[slot],
+        }
@@ -0,0 +1,67 @@
+import logging
+from typing import TYPE_CHECKING
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+
+from openwater.database.backup import BackupException
+from openwater.plugins.rest_api.helpers import respond
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def register_endpoints(ow: "OpenWater") -> None:
+    ow.http.register_route("/api/backups", get_backups, methods=["GET"])
+    ow.http.register_route("/api/backups", create_backup, methods=["POST"])
+    ow.http.register_route("/api/backups/{name:str}", get_backup, methods=["GET"])
+
+
+async def get_backups(request: Request) -> Response:
+    """
+    description: List existing database backups
+    responses:
+      200:
+        description: Backup status and a list of backup files, newest first
+    """
+    ow: "OpenWater" = request.app.ow
+    backups = ow.db.backups
+    return respond({"status": backups.to_dict(), "backups": await backups.list()})
+
+
+async def create_backup(request: Request) -> Response:
+    """
+    description: Run an online backup of the database
+    responses:
+      200:
+        description: The created backup
+      400:
+        description: Backup failed or is not supported
+    """
+    ow: "OpenWater" = request.app.ow
+    try:
+        return respond(await ow.db.backups.backup())
+    except BackupException as e:
+        _LOGGER.error(e)
+        return respond({"error": e.args[0]}, HTTP_400_BAD_REQUEST)
+
+
+async def get_backup(request: Request) -> Response:
+    """
+    description: Download a database snapshot
+    responses:
+      200:
+        description: The backup file
+      404:
+        description: Backup not found
+    """
+    ow: "OpenWater" = request.app.ow
+    name = request.path_params["name"]
+    try:
+        path = ow.db.backups.path_for(name)
+    except BackupException as e:
+        return respond({"error": e.args[0]}, HTTP_404_NOT_FOUND)
+    return FileResponse(path, filename=name, media_type="application/x-sqlite3")
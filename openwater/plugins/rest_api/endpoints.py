@@ -3,7 +3,17 @@ from typing import TYPE_CHECKING
 from starlette import schemas
 
 from openwater.core import OpenWater
-from openwater.plugins.rest_api import plugins, program, schedule, steps, zone
+from openwater.plugins.rest_api import (
+    backup,
+    export,
+    logs,
+    metrics,
+    plugins,
+    program,
+    schedule,
+    steps,
+    zone,
+)
 from openwater.plugins.rest_api.helpers import ToDictJSONResponse, respond
 
 if TYPE_CHECKING:
@@ -15,6 +25,10 @@ schema = schemas.SchemaGenerator(
 
 
 def init_endpoints(ow: OpenWater):
+    backup.register_endpoints(ow)
+    export.register_endpoints(ow)
+    logs.register_endpoints(ow)
+    metrics.register_endpoints(ow)
     plugins.register_endpoints(ow)
     program.register_endpoints(ow)
     schedule.register_endpoints(ow)
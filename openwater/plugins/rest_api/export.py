@@ -0,0 +1,139 @@
+import csv
+import datetime
+import io
+import json
+import logging
+import zlib
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, List, Mapping
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+
+from openwater.database.model import DBModel, log_entry, program_run, zone_run
+from openwater.plugins.rest_api.helpers import ToDictJSONEncoder, respond
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_TABLES = {t.name: t for t in [zone_run, program_run, log_entry]}
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def register_endpoints(ow: "OpenWater") -> None:
+    ow.http.register_route("/api/export/{table:str}", export_table, methods=["GET"])
+
+
+async def export_table(request: Request) -> Response:
+    """
+    description: Stream a history table as CSV or NDJSON
+    parameters:
+      - in: path
+        name: table
+        description: zone_run, program_run or log_entry
+        required: true
+        schema:
+          type: string
+      - in: query
+        name: format
+        description: csv (default) or ndjson
+        schema:
+          type: string
+      - in: query
+        name: gzip
+        description: gzip compress the response
+        schema:
+          type: boolean
+    responses:
+      200:
+        description: The table contents
+      400:
+        description: Invalid export parameters
+      404:
+        description: Table cannot be exported
+    """
+    ow: "OpenWater" = request.app.ow
+    table = EXPORT_TABLES.get(request.path_params["table"])
+    if table is None:
+        return respond({"error": "Table cannot be exported"}, HTTP_404_NOT_FOUND)
+
+    fmt = request.query_params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return respond(
+            {"error": "Unknown format: {}".format(fmt)}, HTTP_400_BAD_REQUEST
+        )
+    compress = request.query_params.get("gzip", "false").lower() in ("1", "true")
+    try:
+        page_size = int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE))
+        after_id = int(request.query_params.get("after_id", 0))
+    except ValueError:
+        return respond({"error": "Invalid paging parameters"}, HTTP_400_BAD_REQUEST)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    content = stream_table(ow, table, encode, page_size, after_id)
+    filename = "{}.{}".format(table.name, fmt)
+    media_type = EXPORT_FORMATS[fmt]
+    if compress:
+        content = gzip_stream(content)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": 'attachment; filename="{}"'.format(filename)},
+    )
+
+
+async def stream_table(
+    ow: "OpenWater",
+    table: DBModel,
+    encode: Callable[[DBModel, List[Mapping], bool], str],
+    page_size: int,
+    after_id: int,
+) -> AsyncGenerator[bytes, None]:
+    first = True
+    async for rows in ow.db.stream_pages(table, page_size, after_id):
+        yield encode(table, rows, first).encode("utf-8")
+        first = False
+    if first:
+        yield encode(table, [], first).encode("utf-8")
+
+
+async def gzip_stream(
+    content: AsyncGenerator[bytes, None],
+) -> AsyncGenerator[bytes, None]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in content:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def to_csv_value(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def encode_csv(table: DBModel, rows: List[Mapping], header: bool) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    columns = [c.name for c in table.columns]
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([to_csv_value(row[c]) for c in columns])
+    return buf.getvalue()
+
+
+def encode_ndjson(table: DBModel, rows: List[Mapping], header: bool) -> str:
+    return "".join(json.dumps(dict(row), cls=ToDictJSONEncoder) + "\n" for row in rows)
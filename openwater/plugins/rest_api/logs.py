@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+
+from openwater.plugins.logger import get_level
+from openwater.plugins.logger.buffer import (
+    DATA_LOG_BUFFER,
+    DEFAULT_QUERY_LIMIT,
+    RingBufferHandler,
+)
+from openwater.plugins.rest_api.helpers import respond
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def register_endpoints(ow: "OpenWater") -> None:
+    ow.http.register_route("/api/logs", get_logs, methods=["GET"])
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+async def get_logs(request: Request) -> Response:
+    """
+    description: Query recent log records held in memory
+    parameters:
+      - in: query
+        name: level
+        description: minimum level name, e.g. WARNING
+        schema:
+          type: string
+      - in: query
+        name: logger
+        description: logger name, includes child loggers
+        schema:
+          type: string
+      - in: query
+        name: since
+        description: ISO datetime or unix timestamp
+        schema:
+          type: string
+    responses:
+      200:
+        description: matching log records, oldest first
+      404:
+        description: the log buffer is not enabled
+    """
+    ow: "OpenWater" = request.app.ow
+    buffer: Optional[RingBufferHandler] = ow.data.get(DATA_LOG_BUFFER)
+    if buffer is None:
+        return respond({"error": "Log buffer not enabled"}, HTTP_404_NOT_FOUND)
+
+    params = request.query_params
+    level = params.get("level")
+    try:
+        since = parse_since(params.get("since"))
+        limit = int(params.get("limit", DEFAULT_QUERY_LIMIT))
+    except ValueError:
+        return respond({"error": "Invalid query parameters"}, HTTP_400_BAD_REQUEST)
+
+    records = buffer.query(
+        level=get_level(level) if level else None,
+        logger=params.get("logger") or None,
+        since=since,
+        limit=limit,
+    )
+    return respond({"records": records})
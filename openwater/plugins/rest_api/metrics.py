@@ -0,0 +1,43 @@
+import logging
+from typing import TYPE_CHECKING
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from openwater.plugins.gpio import DATA_GPIO
+from openwater.plugins.rest_api.helpers import respond
+from openwater.plugins.shift_register import DATA_SHIFT_REGISTER_BANKS
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def register_endpoints(ow: "OpenWater") -> None:
+    ow.http.register_route("/api/metrics", get_metrics, methods=["GET"])
+
+
+async def get_metrics(request: Request) -> Response:
+    """
+    description: Get runtime metrics
+    responses:
+      200:
+        description: Query timing, database writer, backup and GPIO statistics,
+          including the GPIO worker of every shift register bank
+    """
+    ow: "OpenWater" = request.app.ow
+    gpio = ow.data.get(DATA_GPIO)
+    return respond(
+        {
+            "db": {
+                "queries": ow.db.metrics.to_dict(),
+                "writer": ow.db.writer.to_dict(),
+                "backup": ow.db.backups.to_dict(),
+            },
+            "gpio": gpio.metrics if gpio else None,
+            "shift_register": [
+                sr.g.metrics for sr in ow.data.get(DATA_SHIFT_REGISTER_BANKS) or []
+            ],
+        }
+    )
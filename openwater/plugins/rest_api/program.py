@@ -4,8 +4,9 @@ from cerberus import Validator
 from starlette.requests import Request
 from starlette.responses import Response
 
-from openwater.errors import ProgramValidationException
+from openwater.errors import ProgramException, ProgramValidationException
 from openwater.plugins.rest_api.helpers import ToDictJSONResponse, respond
+from openwater.program.plan import compile_plan
 from openwater.program.validation import PROGRAM_SCHEMA
 
 if TYPE_CHECKING:
@@ -17,6 +18,16 @@ def register_endpoints(ow: "OpenWater") -> None:
     ow.http.register_route("/api/programs/{id:int}", get_program, methods=["GET"])
     ow.http.register_route("/api/programs/{id:int}", update_program, methods=["PUT"])
     ow.http.register_route("/api/programs", get_programs, methods=["GET"])
+    ow.http.register_route("/api/programs/queue", get_queue, methods=["GET"])
+    ow.http.register_route("/api/programs/{id:int}/run", run_program, methods=["POST"])
+    ow.http.register_route("/api/programs/{id:int}/plan", get_plan, methods=["GET"])
+    ow.http.register_route(
+        "/api/programs/{id:int}/pause", pause_program, methods=["POST"]
+    )
+    ow.http.register_route(
+        "/api/programs/{id:int}/resume", resume_program, methods=["POST"]
+    )
+    ow.http.register_route("/api/programs/{id:int}/skip", skip_step, methods=["POST"])
 
 
 async def add_program(request: Request) -> Response:
@@ -54,3 +65,85 @@ async def get_programs(request: Request) -> Response:
     """
     ow: "OpenWater" = request.app.ow
     return ToDictJSONResponse([p.to_dict() for p in ow.programs.store.all])
+
+
+async def get_queue(request: Request) -> Response:
+    ow: "OpenWater" = request.app.ow
+    return respond(ow.programs.queue)
+
+
+async def run_program(request: Request) -> Response:
+    ow: "OpenWater" = request.app.ow
+    id_ = int(request.path_params["id"])
+    program = ow.programs.store.get(id_)
+    if program is None:
+        return respond({"errors": ["Program not found"]}, status_code=404)
+    try:
+        priority = int(request.query_params.get("priority", 0))
+    except ValueError:
+        return respond({"errors": ["Invalid priority"]}, status_code=400)
+    return respond(ow.programs.queue.submit(program, priority=priority))
+
+
+async def get_plan(request: Request) -> Response:
+    """
+    description: Preview the valve actions of a program run
+    responses:
+      200:
+        description: Valve actions as offsets in seconds from the program start
+      404:
+        description: Program not found
+    """
+    ow: "OpenWater" = request.app.ow
+    id_ = int(request.path_params["id"])
+    program = ow.programs.store.get(id_)
+    if program is None:
+        return respond({"errors": ["Program not found"]}, status_code=404)
+    return respond(compile_plan(program))
+
+
+async def pause_program(request: Request) -> Response:
+    """
+    description: Close the zones of a running program and hold its progress
+    responses:
+      200:
+        description: The paused run
+      409:
+        description: Program is not running
+    """
+    ow: "OpenWater" = request.app.ow
+    return await _control_run(ow.programs.controller.pause, request)
+
+
+async def resume_program(request: Request) -> Response:
+    """
+    description: Continue a paused program where it stopped
+    responses:
+      200:
+        description: The resumed run
+      409:
+        description: Program is not running
+    """
+    ow: "OpenWater" = request.app.ow
+    return await _control_run(ow.programs.controller.resume, request)
+
+
+async def skip_step(request: Request) -> Response:
+    """
+    description: End the current step of a running program early
+    responses:
+      200:
+        description: The run, continuing with the next step
+      409:
+        description: Program is not running
+    """
+    ow: "OpenWater" = request.app.ow
+    return await _control_run(ow.programs.controller.skip, request)
+
+
+async def _control_run(action, request: Request) -> Response:
+    id_ = int(request.path_params["id"])
+    try:
+        return respond(await action(id_))
+    except ProgramException as e:
+        return respond({"errors": [str(e)]}, status_code=409)
@@ -1,6 +1,7 @@
 import logging
+from datetime import date, datetime, timedelta
 from json.decoder import JSONDecodeError
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from starlette.endpoints import HTTPEndpoint
 from starlette.requests import Request
@@ -9,6 +10,8 @@ from starlette.status import *
 
 from openwater.errors import ScheduleValidationException
 from openwater.plugins.rest_api.helpers import respond
+from openwater.schedule.conflicts import DEFAULT_CONFLICT_DAYS, find_conflicts
+from openwater.schedule.helpers import get_occurrences
 from openwater.schedule.model import ScheduleType
 
 if TYPE_CHECKING:
@@ -16,11 +19,20 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_OCCURRENCE_DAYS = 7
+MAX_OCCURRENCE_DAYS = 366
+
 
 def register_endpoints(ow: "OpenWater") -> None:
     ow.http.register_endpoint(ScheduleEndpoint)
     ow.http.register_endpoint(SchedulesEndpoint)
     ow.http.register_route("/api/schedule_types", get_schedule_types, methods=["GET"])
+    ow.http.register_route(
+        "/api/schedules/occurrences", get_schedule_occurrences, methods=["GET"]
+    )
+    ow.http.register_route(
+        "/api/schedules/conflicts", get_schedule_conflicts, methods=["GET"]
+    )
 
 
 class ScheduleEndpoint(HTTPEndpoint):
@@ -78,6 +90,89 @@ async def get_schedule_types(request: Request) -> Response:
     return respond([st.value for st in ScheduleType])
 
 
+async def get_schedule_occurrences(request: Request) -> Response:
+    """
+    description: Get the times schedules will run between two dates
+    parameters:
+      - in: query
+        name: from
+        description: first day (YYYY-MM-DD), defaults to today
+        schema:
+          type: string
+      - in: query
+        name: to
+        description: last day (YYYY-MM-DD), defaults to a week after from
+        schema:
+          type: string
+      - in: query
+        name: program_id
+        description: only include schedules for this program
+        schema:
+          type: integer
+    responses:
+      200:
+        description: A list of schedule occurrences ordered by start time
+      400:
+        description: Invalid date range
+    """
+    ow: "OpenWater" = request.app.ow
+    params = request.query_params
+    try:
+        start = _parse_date(params.get("from")) or date.today()
+        end = _parse_date(params.get("to")) or start + timedelta(
+            days=DEFAULT_OCCURRENCE_DAYS
+        )
+        program_id = params.get("program_id")
+        program_id = int(program_id) if program_id else None
+    except ValueError as e:
+        return respond({"error": e.args[0]}, HTTP_400_BAD_REQUEST)
+
+    if end < start or (end - start).days > MAX_OCCURRENCE_DAYS:
+        return respond({"error": "Invalid date range"}, HTTP_400_BAD_REQUEST)
+    return respond(get_occurrences(ow, start, end, program_id))
+
+
+async def get_schedule_conflicts(request: Request) -> Response:
+    """
+    description: Find schedules whose programs would run at the same time on a shared zone
+    parameters:
+      - in: query
+        name: from
+        description: first day (YYYY-MM-DD), defaults to today
+        schema:
+          type: string
+      - in: query
+        name: to
+        description: last day (YYYY-MM-DD), defaults to two weeks after from
+        schema:
+          type: string
+    responses:
+      200:
+        description: A list of conflicting schedule pairs ordered by first overlap
+      400:
+        description: Invalid date range
+    """
+    ow: "OpenWater" = request.app.ow
+    params = request.query_params
+    try:
+        start = _parse_date(params.get("from")) or date.today()
+        end = _parse_date(params.get("to")) or start + timedelta(
+            days=DEFAULT_CONFLICT_DAYS
+        )
+    except ValueError as e:
+        return respond({"error": e.args[0]}, HTTP_400_BAD_REQUEST)
+
+    if end < start or (end - start).days > MAX_OCCURRENCE_DAYS:
+        return respond({"error": "Invalid date range"}, HTTP_400_BAD_REQUEST)
+    return respond(find_conflicts(ow, start, end))
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
 # async def get_schedules_for_program(request: Request) -> Response:
 #     ow: "OpenWater" = request.app.ow
 #     id_ = request.path_params["id"]
@@ -18,6 +18,7 @@ def register_endpoints(ow: "OpenWater"):
     ow.http.register_endpoint(Zone)
     ow.http.register_route("/api/zones", create_zone, methods=["POST"])
     ow.http.register_route("/api/zones", get_zones, methods=["GET"])
+    ow.http.register_route("/api/zones/leases", get_leases, methods=["GET"])
     ow.http.register_route(
         "/api/zones/{zone_id:int}/{cmd:str}", zone_cmd, methods=["POST"]
     )
@@ -130,3 +131,14 @@ async def zone_cmd(request: Request):
     except ZoneException as e:
         _LOGGER.error(e)
         return respond(status_code=500)
+
+
+async def get_leases(request: Request):
+    """
+    description: Get the holders of every leased master zone
+    responses:
+      200:
+        description: Lease holders by master zone id
+    """
+    ow: "OpenWater" = request.app.ow
+    return respond(ow.zones.controller)
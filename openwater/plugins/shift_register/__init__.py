@@ -1,10 +1,18 @@
-from typing import TYPE_CHECKING, Optional
+import asyncio
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
 
 from cerberus import Validator
 
 from openwater.constants import EVENT_ZONE_STATE
 from openwater.errors import ZoneException, ZoneValidationException
 from openwater.plugins.gpio import DATA_GPIO, OWGpio
+from openwater.plugins.gpio.worker import GpioWorker
+from openwater.plugins.shift_register.spi import (
+    DEFAULT_SPI_SPEED_HZ,
+    SimulatedSpiDevice,
+    mask_to_bytes,
+    open_spi,
+)
 from openwater.zone.model import BaseZone
 
 if TYPE_CHECKING:
@@ -12,54 +20,135 @@ if TYPE_CHECKING:
 
 
 DATA_SHIFT_REGISTER = "SHIFT_REGISTER"
+DATA_SHIFT_REGISTER_BANKS = "SHIFT_REGISTER_BANKS"
 ZONE_TYPE_SHIFT_REGISTER = "SHIFT_REGISTER"
 
+BACKEND_GPIO = "gpio"
+BACKEND_SPI = "spi"
+BACKEND_SPI_SIMULATED = "spi_simulated"
+
 
 def setup_plugin(ow: "OpenWater", config: dict = {}):
     gpio: Optional[OWGpio] = ow.data[DATA_GPIO]
     if not gpio:
         raise ZoneException("Required plugin(s) not enabled: {}", ["gpio"])
 
-    num_reg = config.get("num_reg", 8)
-    data_pin = config.get("data_pin", 0)
-    clock_pin = config.get("clock_pin", 0)
-    oe_pin = config.get("oe_pin", 0)
-    latch_pin = config.get("latch_pin", 0)
-    if not (data_pin and clock_pin and oe_pin and latch_pin):
-        raise ZoneException("Must define all required shift register pins")
-
-    gpio.set_output([data_pin, clock_pin, oe_pin, latch_pin])
-    active_high = config.get("active_high", True)
-    sr = ShiftRegister(
-        ow, gpio, data_pin, clock_pin, oe_pin, latch_pin, num_reg, active_high
-    )
-    ow.data[DATA_SHIFT_REGISTER] = sr
+    banks = [
+        create_bank(ow, gpio, bank, bank_config)
+        for bank, bank_config in enumerate(config.get("banks") or [config])
+    ]
+    ow.data[DATA_SHIFT_REGISTER_BANKS] = banks
+    ow.data[DATA_SHIFT_REGISTER] = banks[0]
 
     ow.zones.registry.register_zone_type(
         ZONE_TYPE_SHIFT_REGISTER, ShiftRegisterZone, create_zone
     )
 
 
+def create_bank(
+    ow: "OpenWater", gpio: OWGpio, bank: int, config: dict
+) -> "ShiftRegister":
+    """
+    Shift register chain of one bank. Every bank is written by a GPIO worker
+    of its own, so banks are written in parallel
+    """
+    worker = GpioWorker(
+        ow.event_loop,
+        name=config.get("thread_name", "gpio-sr{}".format(bank)),
+        priority=config.get("priority"),
+    )
+    bank_gpio = OWGpio(ow, worker)
+    num_reg = config.get("num_reg", 8)
+    oe_pin = config.get("oe_pin", 0)
+    active_high = config.get("active_high", True)
+    backend = config.get("backend", BACKEND_GPIO)
+    if backend == BACKEND_GPIO:
+        data_pin = config.get("data_pin", 0)
+        clock_pin = config.get("clock_pin", 0)
+        latch_pin = config.get("latch_pin", 0)
+        if not (data_pin and clock_pin and oe_pin and latch_pin):
+            raise ZoneException(
+                "Must define all required pins of shift register bank {}".format(bank)
+            )
+
+        gpio.set_output([data_pin, clock_pin, oe_pin, latch_pin])
+        return ShiftRegister(
+            ow, bank_gpio, data_pin, clock_pin, oe_pin, latch_pin, num_reg, active_high
+        )
+    if backend in (BACKEND_SPI, BACKEND_SPI_SIMULATED):
+        speed_hz = config.get("spi_speed_hz", DEFAULT_SPI_SPEED_HZ)
+        if backend == BACKEND_SPI:
+            device = open_spi(
+                config.get("spi_bus", 0),
+                config.get("spi_device", 0),
+                speed_hz,
+                config.get("spi_mode", 0),
+            )
+        else:
+            device = SimulatedSpiDevice(num_reg, speed_hz)
+        if oe_pin:
+            gpio.set_output(oe_pin)
+        return SpiShiftRegister(ow, bank_gpio, device, num_reg, oe_pin, active_high)
+    raise ZoneException("Unknown shift register backend: {}".format(backend))
+
+
 def create_zone(ow: "OpenWater", zone_data: dict) -> "ShiftRegisterZone":
-    attr_schema = {"sr_idx": {"type": "integer", "required": True}}
-    v: Validator = Validator(attr_schema)
+    v: Validator = Validator(ShiftRegisterZone.ATTR_SCHEMA)
     v.allow_unknown = True
     if not v.validate(zone_data["attrs"]):
         raise ZoneValidationException("ShiftRegisterZone validation failed", v.errors)
+    errors = ShiftRegisterZone.check_attrs(ow, zone_data["attrs"])
+    if errors:
+        raise ZoneValidationException("ShiftRegisterZone validation failed", errors)
     return ShiftRegisterZone(ow, **zone_data)
 
 
+async def _switch(zones: List["ShiftRegisterZone"], on: bool) -> None:
+    """Switch zones with one write per bank, writing the banks in parallel"""
+    by_bank: Dict[ShiftRegister, List[int]] = {}
+    for zone in zones:
+        by_bank.setdefault(zone._sr, []).append(zone._sr_idx)
+    await asyncio.gather(
+        *(
+            sr.async_apply(on=regs) if on else sr.async_apply(off=regs)
+            for sr, regs in by_bank.items()
+        )
+    )
+    for zone in zones:
+        zone._ow.bus.fire(EVENT_ZONE_STATE, zone)
+
+
 class ShiftRegisterZone(BaseZone):
-    ATTR_SCHEMA = {"sr_idx": {"type": "integer", "required": True}}
+    ATTR_SCHEMA = {
+        "sr_bank": {"type": "integer", "nullable": True, "min": 0},
+        "sr_idx": {"type": "integer", "required": True, "min": 0},
+    }
 
     def __init__(self, ow: "OpenWater", **kwargs: dict):
         super().__init__(ow=ow, **kwargs)
-        self._sr: "ShiftRegister" = ow.data[DATA_SHIFT_REGISTER]
-        self._sr_idx = kwargs.get("attrs").get("sr_idx")
+        attrs = kwargs.get("attrs")
+        self._sr_bank = attrs.get("sr_bank") or 0
+        self._sr: "ShiftRegister" = ow.data[DATA_SHIFT_REGISTER_BANKS][self._sr_bank]
+        self._sr_idx = attrs.get("sr_idx")
 
     @property
     def extra_attrs(self):
-        return {"sr_idx": self._sr_idx}
+        return {"sr_bank": self._sr_bank, "sr_idx": self._sr_idx}
+
+    @classmethod
+    def check_attrs(cls, ow: "OpenWater", attrs: dict) -> Optional[dict]:
+        """The bank must be configured and the index within its registers"""
+        banks: List[ShiftRegister] = ow.data[DATA_SHIFT_REGISTER_BANKS]
+        bank = attrs.get("sr_bank") or 0
+        if bank >= len(banks):
+            return {"sr_bank": ["no shift register bank {}".format(bank)]}
+        if attrs["sr_idx"] >= banks[bank].num_regs:
+            return {
+                "sr_idx": [
+                    "bank {} has {} registers".format(bank, banks[bank].num_regs)
+                ]
+            }
+        return None
 
     def is_open(self) -> bool:
         return bool(self._sr.get_reg_status(self._sr_idx))
@@ -72,19 +161,32 @@ class ShiftRegisterZone(BaseZone):
         await self._sr.async_turn_off(self._sr_idx)
         self._ow.bus.fire(EVENT_ZONE_STATE, self)
 
+    @classmethod
+    async def open_many(cls, zones: List["ShiftRegisterZone"]) -> None:
+        await _switch(zones, True)
+
+    @classmethod
+    async def close_many(cls, zones: List["ShiftRegisterZone"]) -> None:
+        await _switch(zones, False)
+
     def get_zone_type(self) -> str:
         return "SHIFT_REGISTER"
 
     @staticmethod
     def get_additional_config(ow: "OpenWater"):
-        sr = ow.data[DATA_SHIFT_REGISTER]
-        num_reg = sr.num_regs
+        banks: List[ShiftRegister] = ow.data[DATA_SHIFT_REGISTER_BANKS]
+        num_reg = max(sr.num_regs for sr in banks)
         return {
+            "sr_bank": {
+                "type": "select",
+                "label": "Shift Register Bank",
+                "options": list(range(len(banks))),
+            },
             "sr_idx": {
                 "type": "select",
                 "label": "Physical Shift Register Index",
                 "options": list(range(num_reg)),
-            }
+            },
         }
 
 
@@ -108,13 +210,17 @@ class ShiftRegister:
         self.latch_pin = latch_pin
         self.num_regs = num_regs
         self.active_high = active_high
-        self._reg_mask = 0
+        # Bits as shifted out, all registers start off
+        self._reg_mask = 0 if active_high else (1 << num_regs) - 1
+        self._lock = asyncio.Lock()
 
-    def write_registers(self) -> None:
+    def write_registers(self, mask: Optional[int] = None) -> None:
+        if mask is None:
+            mask = self._reg_mask
         self.g.low([self.clock_pin, self.latch_pin])
         for reg in range(self.num_regs):
             self.g.low(self.clock_pin)
-            if 1 & (self._reg_mask >> reg):
+            if 1 & (mask >> reg):
                 self.g.high(self.data_pin)
             else:
                 self.g.low(self.data_pin)
@@ -122,81 +228,122 @@ class ShiftRegister:
         self.g.high(self.latch_pin)
 
     async def async_write_registers(self) -> None:
-        await self.g.async_low([self.clock_pin, self.latch_pin])
-        for reg in range(self.num_regs):
-            await self.g.async_low(self.clock_pin)
-            if 1 & (self._reg_mask >> reg):
-                await self.g.async_high(self.data_pin)
-            else:
-                await self.g.async_low(self.data_pin)
-            await self.g.async_high(self.clock_pin)
-        await self.g.async_high(self.latch_pin)
+        """Shift the registers out in one hop to the GPIO hardware thread"""
+        await self.g.run(
+            self.write_registers, self._reg_mask, ops=3 * self.num_regs + 2
+        )
+
+    def batch(self) -> "RegisterBatch":
+        """Collect register changes to write in a single latch cycle"""
+        return RegisterBatch(self)
+
+    def apply(self, on: Iterable[int] = (), off: Iterable[int] = ()) -> None:
+        """Turn registers on and off, shifting the chain out once"""
+        if self._update_mask(on, off):
+            self.write_registers()
+
+    async def async_apply(self, on: Iterable[int] = (), off: Iterable[int] = ()):
+        """
+        Turn registers on and off, shifting the chain out once. Writes are
+        serialized so concurrent callers never interleave their clock and data
+        toggles
+        """
+        async with self._lock:
+            if self._update_mask(on, off):
+                await self.async_write_registers()
 
     def turn_on(self, reg: int) -> None:
-        if reg > self.num_regs - 1:
-            raise ZoneException(
-                "Attempted to turn on register {}, but SR only has {} registers",
-                reg,
-                self.num_regs,
-            )
+        self.apply(on=[reg])
 
-        if self.active_high:
-            self._reg_mask |= 1 << reg
-        else:
-            self._reg_mask ^= 1 << reg
+    async def async_turn_on(self, reg: int) -> None:
+        await self.async_apply(on=[reg])
 
-        self.write_registers()
+    def turn_off(self, reg: int) -> None:
+        self.apply(off=[reg])
 
-    async def async_turn_on(self, reg: int) -> None:
-        if reg > self.num_regs - 1:
-            raise ZoneException(
-                "Attempted to turn on register {}, but SR only has {} registers",
-                reg,
-                self.num_regs,
-            )
+    async def async_turn_off(self, reg: int) -> None:
+        await self.async_apply(off=[reg])
 
-        if self.active_high:
-            self._reg_mask |= 1 << reg
-        else:
-            self._reg_mask ^= 1 << reg
+    def disable_output(self) -> None:
+        if self.oe_pin:
+            self.g.high(self.oe_pin)
 
-        await self.async_write_registers()
+    async def async_disable_outputs(self):
+        if self.oe_pin:
+            await self.g.async_high(self.oe_pin)
+
+    def get_reg_status(self, reg: int) -> int:
+        return int(bool(1 & (self._reg_mask >> reg)) == self.active_high)
+
+    def _update_mask(self, on: Iterable[int], off: Iterable[int]) -> bool:
+        """Set the bits of the registers turned on and off, True if any changed"""
+        mask = self._reg_mask
+        for reg, state in [(r, False) for r in off] + [(r, True) for r in on]:
+            if not 0 <= reg < self.num_regs:
+                raise ZoneException(
+                    "Attempted to switch register {}, but SR only has {} "
+                    "registers".format(reg, self.num_regs)
+                )
+            if state == self.active_high:
+                mask |= 1 << reg
+            else:
+                mask &= ~(1 << reg)
+        changed = mask != self._reg_mask
+        self._reg_mask = mask
+        return changed
 
-    def turn_off(self, reg: int) -> None:
-        if reg > self.num_regs - 1:
-            raise ZoneException(
-                "Attempted to turn off register {}, but SR only has {} registers",
-                reg,
-                self.num_regs,
-            )
 
-        if self.active_high:
-            self._reg_mask ^= 1 << reg
-        else:
-            self._reg_mask |= 1 << reg
+class SpiShiftRegister(ShiftRegister):
+    """
+    Shift register chain driven by the SPI controller: the register mask is
+    written as bytes over MOSI and SCLK, and chip select latches the chain
+    when the transfer ends. The output enable pin stays on GPIO, if wired
+    """
 
-        self.write_registers()
+    def __init__(
+        self,
+        ow: "OpenWater",
+        gpio: "OWGpio",
+        device,
+        num_regs: int,
+        oe_pin: int = 0,
+        active_high: bool = True,
+    ):
+        super().__init__(ow, gpio, 0, 0, oe_pin, 0, num_regs, active_high)
+        self.device = device
 
-    async def async_turn_off(self, reg: int) -> None:
-        if reg > self.num_regs - 1:
-            raise ZoneException(
-                "Attempted to turn off register {}, but SR only has {} registers",
-                reg,
-                self.num_regs,
-            )
+    def write_registers(self, mask: Optional[int] = None) -> None:
+        if mask is None:
+            mask = self._reg_mask
+        self.device.writebytes2(mask_to_bytes(mask, self.num_regs))
 
-        if self.active_high:
-            self._reg_mask ^= 1 << reg
-        else:
-            self._reg_mask |= 1 << reg
+    async def async_write_registers(self) -> None:
+        """Write the registers in one SPI transfer in the GPIO thread"""
+        await self.g.run(self.write_registers, self._reg_mask)
 
-        await self.async_write_registers()
 
-    def disable_output(self) -> None:
-        self.g.high(self.oe_pin)
+class RegisterBatch:
+    """
+    Register changes written together when the batch exits, a register both
+    turned on and off in one batch keeps the last state
+    """
 
-    async def async_disable_outputs(self):
-        await self.g.async_high(self.oe_pin)
+    def __init__(self, sr: ShiftRegister):
+        self._sr = sr
+        self.on: Set[int] = set()
+        self.off: Set[int] = set()
+
+    def turn_on(self, reg: int) -> None:
+        self.off.discard(reg)
+        self.on.add(reg)
+
+    def turn_off(self, reg: int) -> None:
+        self.on.discard(reg)
+        self.off.add(reg)
+
+    async def __aenter__(self) -> "RegisterBatch":
+        return self
 
-    def get_reg_status(self, reg: int):
-        return 1 & (self._reg_mask >> reg)
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self._sr.async_apply(self.on, self.off)
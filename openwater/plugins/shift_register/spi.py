@@ -0,0 +1,69 @@
+from openwater.errors import ZoneException
+
+DEFAULT_SPI_SPEED_HZ = 1000000
+
+
+def mask_to_bytes(mask: int, num_regs: int) -> bytes:
+    """
+    Bytes shifting out the same bit sequence as ShiftRegister.write_registers:
+    register 0 first, most significant bit first. Padding for chains that
+    are not a whole number of bytes goes first, so it falls off the far end
+    """
+    num_bytes = (num_regs + 7) // 8
+    reversed_mask = int(format(mask, "0{}b".format(num_regs))[::-1], 2)
+    return reversed_mask.to_bytes(num_bytes, "big")
+
+
+def open_spi(bus: int, device: int, speed_hz: int, mode: int = 0):
+    """Open a spidev device, spidev is only needed for the spi backend"""
+    try:
+        import spidev
+    except ImportError:
+        raise ZoneException("The spi shift register backend requires spidev")
+    spi = spidev.SpiDev()
+    spi.open(bus, device)
+    spi.max_speed_hz = speed_hz
+    spi.mode = mode
+    return spi
+
+
+class SimulatedSpiDevice:
+    """
+    A chain of 74HC595 registers behind a spidev style device. Bits written
+    are clocked into the chain and latched when the transfer ends, like the
+    chip select rising edge latching the storage registers
+    """
+
+    def __init__(self, num_regs: int, speed_hz: int = DEFAULT_SPI_SPEED_HZ):
+        self.num_regs = num_regs
+        self.max_speed_hz = speed_hz
+        self.mode = 0
+        self.transfers = 0
+        self.bytes_written = 0
+        self._shift = 0
+        # Output of every chain position, bit 0 is the output nearest to MOSI
+        self.latched = 0
+
+    def writebytes2(self, data: bytes) -> None:
+        full = (1 << self.num_regs) - 1
+        for byte in data:
+            for bit in range(7, -1, -1):
+                self._shift = ((self._shift << 1) | (byte >> bit) & 1) & full
+        self.latched = self._shift
+        self.transfers += 1
+        self.bytes_written += len(data)
+
+    def xfer2(self, data: list) -> list:
+        self.writebytes2(bytes(data))
+        return [0] * len(data)
+
+    def register_mask(self) -> int:
+        """Latched outputs as a register mask, register 0 is the farthest"""
+        return int(format(self.latched, "0{}b".format(self.num_regs))[::-1], 2)
+
+    def wire_time(self, data_len: int) -> float:
+        """Seconds the clock takes to shift data_len bytes at max_speed_hz"""
+        return data_len * 8 / self.max_speed_hz
+
+    def close(self) -> None:
+        pass
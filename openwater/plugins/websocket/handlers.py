@@ -1,11 +1,13 @@
 from typing import TYPE_CHECKING
 
 from openwater.constants import (
+    EVENT_FORECAST,
     EVENT_ZONE_STATE,
     EVENT_PROGRAM_STATE,
     EVENT_SCHEDULE_STATE,
 )
 from openwater.plugins.websocket.response import (
+    ForecastResponse,
     ZonesResponse,
     ProgramsResponse,
     SchedulesResponse,
@@ -23,6 +25,7 @@ def setup_handlers(ow: "OpenWater", ws: "WebSocketApi"):
     ow.bus.listen(EVENT_ZONE_STATE, handler.zone_state)
     ow.bus.listen(EVENT_PROGRAM_STATE, handler.program_state)
     ow.bus.listen(EVENT_SCHEDULE_STATE, handler.schedule_state)
+    ow.bus.listen(EVENT_FORECAST, handler.forecast)
 
 
 class WSEventHandler:
@@ -43,3 +46,7 @@ class WSEventHandler:
     @nonblocking
     def zone_state(self, event: "Event") -> None:
         self.ws.respond(ZonesResponse(self._ow.zones.store.all))
+
+    @nonblocking
+    def forecast(self, event: "Event") -> None:
+        self.ws.respond(ForecastResponse(event.data))
@@ -42,3 +42,13 @@ class ZonesResponse(WebsocketResponse):
     @property
     def data(self):
         return {"zones": self.zones}
+
+
+class ForecastResponse(WebsocketResponse):
+    def __init__(self, forecast):
+        super().__init__(type="state.forecast")
+        self.forecast = forecast
+
+    @property
+    def data(self):
+        return self.forecast.to_dict()
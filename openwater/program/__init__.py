@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
 from openwater.program.controller import ProgramController
+from openwater.program.queue import RunQueue
 from openwater.program.registry import ProgramRegistry
 from openwater.program.store import ProgramStore
 
@@ -13,3 +14,4 @@ class ProgramManager:
         self.registry = ProgramRegistry()
         self.store = ProgramStore(ow, self.registry)
         self.controller = ProgramController(ow)
+        self.queue = RunQueue(ow)
@@ -1,146 +1,478 @@
 import asyncio
 import logging
-from datetime import datetime
-from typing import TYPE_CHECKING, Optional, Callable
+import threading
+from asyncio import TimerHandle
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional, Dict, List, Set
 
-from openwater.constants import EVENT_TIMER_TICK_SEC, EVENT_PROGRAM_COMPLETED
-from openwater.program.model import (
-    BaseProgram,
-    ProgramStep,
+from openwater.constants import (
+    EVENT_APP_STARTED,
+    EVENT_PROGRAM_COMPLETED,
+    EVENT_PROGRAM_STATE,
+)
+from openwater.errors import ProgramException
+from openwater.program.model import BaseProgram, ProgramStep
+from openwater.program.plan import (
+    ACTION_CLOSE,
+    ACTION_OPEN,
+    ACTION_STEP,
+    ExecutionPlan,
+    PlanAction,
+    compile_plan,
 )
 from openwater.utils.decorator import nonblocking
+from openwater.utils.state import StateFile, state_path
 
 if TYPE_CHECKING:
-    from openwater.core import OpenWater
+    from openwater.core import OpenWater, Event
 
 _LOGGER = logging.getLogger(__name__)
 
+STATE_FILE = "programs.json"
+
+INTERRUPTED_ABORT = "abort"
+INTERRUPTED_RESUME = "resume"
+DEFAULT_INTERRUPTED_POLICY = INTERRUPTED_ABORT
+DEFAULT_INTERRUPTED_WINDOW = 60  # minutes
+
+
+class ProgramRun:
+    """A single queued or running instance of a program"""
+
+    def __init__(
+        self,
+        program: BaseProgram,
+        schedule_id: Optional[int] = None,
+        priority: int = 0,
+        offset: float = 0,
+    ):
+        self.program = program
+        self.schedule_id = schedule_id
+        self.priority = priority
+        self.offset = offset
+        self.queued_at: Optional[datetime] = None
+        self.started_at: Optional[datetime] = None
+        self.step_idx: Optional[int] = None
+        self.step: Optional[ProgramStep] = None
+        self.plan: Optional[ExecutionPlan] = None
+        self.position = 0
+        self.origin: Optional[float] = None
+        self.deadline: Optional[TimerHandle] = None
+        self.open_zones: Set[int] = set()
+        self.paused_at: Optional[float] = None
+        # Bumped whenever the timeline is stopped or moved, so actions still
+        # being applied for an older timeline stop
+        self.epoch = 0
+        # Held while zones are switched, so a pause waits for valves in flight
+        self.lock = asyncio.Lock()
+
+    @property
+    def holder(self) -> str:
+        """Lease holder for the master zones of this run"""
+        return "program:{}".format(self.program.id)
+
+    @property
+    def paused(self) -> bool:
+        return self.paused_at is not None
+
+    def to_dict(self) -> dict:
+        return {
+            "program_id": self.program.id,
+            "schedule_id": self.schedule_id,
+            "priority": self.priority,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "step_idx": self.step_idx,
+            "step_deadline": self.step.run_until if self.step else None,
+            "paused": self.paused,
+        }
+
 
 class ProgramController:
+    """
+    Runs programs from their compiled execution plan. Each run has a single
+    loop deadline for its next valve action, so nothing runs while zones water
+    """
+
     def __init__(self, ow: "OpenWater"):
         self.ow = ow
-        self.current_program: Optional[BaseProgram] = None
-        self.current_run_id: Optional[int] = None
-        self.current_step_idx: Optional[int] = None
-        self.current_step: Optional[ProgramStep] = None
-        self.remove_listener_sec: Optional[Callable] = None
+        self.runs: Dict[int, ProgramRun] = dict()
+        self.state: Optional[StateFile] = StateFile(state_path(STATE_FILE))
+        self._checkpoint: Optional[dict] = None
+        self._checkpoint_lock = threading.Lock()
+        self._writing = False
+        ow.bus.listen(EVENT_APP_STARTED, self.reconcile)
 
-    async def run_program(self, program: BaseProgram) -> None:
+    @property
+    def config(self) -> dict:
+        return (self.ow.config or {}).get("programs") or {}
+
+    async def run_program(self, run: ProgramRun) -> None:
+        program = run.program
         _LOGGER.debug("Running program %d: %s", program.id, program.name)
-        self.current_program = program
-        await self.next_step()
+        for step in program.steps:
+            step.reset()
+        program.is_running = True
+        self.runs[program.id] = run
+        run.plan = compile_plan(program)
+        run.position = 0
+        run.open_zones = set()
+        if run.paused:
+            self.checkpoint()
+            return
+        await self.seek(run, run.offset)
 
     @nonblocking
-    def program_complete(self):
-        _LOGGER.debug(
-            "Completed program %d: %s",
-            self.current_program.id,
-            self.current_program.name,
-        )
-        if self.remove_listener_sec is not None:
-            self.remove_listener_sec()
+    def program_complete(self, run: ProgramRun):
+        program = run.program
+        _LOGGER.debug("Completed program %d: %s", program.id, program.name)
+        run.deadline = None
+        program.is_running = False
+        self.runs.pop(program.id, None)
+        self.checkpoint()
         self.ow.bus.fire(
-            EVENT_PROGRAM_COMPLETED, data={"program": self, "now": datetime.now()}
+            EVENT_PROGRAM_COMPLETED,
+            data={"program": program, "run": run, "now": self.ow.clock.now()},
         )
 
-    async def check_progress(self, event):
-        step = self.current_step
-        _LOGGER.debug("Checking program progress: Step: %d", step.id)
+    def cancel_timers(self, run: ProgramRun) -> None:
+        """Cancel the pending deadline of a run and any actions being applied"""
+        run.epoch += 1
+        if run.deadline is not None:
+            run.deadline.cancel()
+            run.deadline = None
 
-        if not step.is_complete():
-            _LOGGER.debug("Step not complete: %d", step.id)
+    @nonblocking
+    def deadline_reached(self, run: ProgramRun) -> None:
+        run.deadline = None
+        if self.is_current(run, run.epoch):
+            self.ow.fire_coroutine(self.execute_due(run, run.epoch))
+
+    def is_current(self, run: ProgramRun, epoch: int) -> bool:
+        """Whether a run is active, not paused, and still on the given timeline"""
+        return (
+            not run.paused
+            and run.epoch == epoch
+            and self.runs.get(run.program.id) is run
+        )
+
+    async def execute_due(self, run: ProgramRun, epoch: Optional[int] = None) -> None:
+        """
+        Apply every plan action that is due, then wait for the next one. Stops
+        as soon as the run is paused, moved or ended while zones are switched
+        """
+        epoch = run.epoch if epoch is None else epoch
+        if not self.is_current(run, epoch):
             return
+        elapsed = self.ow.event_loop.time() - run.origin
+        actions = run.plan.actions
+        end = run.position
+        while end < len(actions) and actions[end].at <= elapsed:
+            end += 1
+        async with run.lock:
+            if not await self.apply_all(run, actions[run.position : end], epoch):
+                return
 
-        _LOGGER.debug("Step complete: %d", step.id)
-        if step.running:
-            await self.finish_step(step)
-        step.end()
-        _LOGGER.debug("Program step %d finished", self.current_step_idx)
-        await self.next_step()
-
-    async def finish_step(self, step: ProgramStep) -> None:
-        next_step = self.get_next_step()
-        next_masters = next_step.master_zones if next_step else []
-        for zone in step.zones:
-            await self.ow.zones.controller.close_zone(zone.id)
-            if zone.master_zones is None:
-                continue
-            for mz in zone.master_zones:
-                if mz in next_masters:
-                    _LOGGER.debug(
-                        "Master zone %d will be used in next step - not closing", mz.id
-                    )
-                    continue
-                if mz.close_offset <= 0:
-                    _LOGGER.debug("Closing master zone %d now", mz.id)
-                    self.ow.fire_coroutine(self.ow.zones.controller.close_zone(mz.id))
-                else:
-                    _LOGGER.debug(
-                        "Closing master zone %d in %d seconds", mz.id, mz.close_offset
-                    )
-                    self.ow.run_coroutine_in(
-                        self.ow.zones.controller.close_zone(mz.id), mz.close_offset,
-                    )
-
-    async def complete_step(self):
-        pass
-
-    def get_next_step(self) -> Optional[ProgramStep]:
-        next_step_idx = self.current_step_idx + 1
-        if len(self.current_program.steps) <= next_step_idx:
-            return None
-        return self.current_program.steps[next_step_idx]
-
-    async def start_step(self, step: ProgramStep) -> None:
-        if not step.zones:
-            _LOGGER.debug("No zones - Soak step")
+        if run.position >= len(actions):
+            self.program_complete(run)
             return
-        mzs = [
-            mz
-            for mz in sorted(
-                step.master_zones, key=lambda z: z.open_offset, reverse=True
-            )
-            if not mz.is_open()
-        ]
-        if not mzs:
-            _LOGGER.debug("No master zones in this step - opening zones")
-            await asyncio.gather(
-                *[self.ow.zones.controller.open_zone(zone.id) for zone in step.zones]
+        loop = self.ow.event_loop
+        run.deadline = loop.call_at(
+            run.origin + actions[run.position].at, self.deadline_reached, run
+        )
+
+    async def apply(self, run: ProgramRun, action: PlanAction) -> None:
+        if action.action == ACTION_OPEN:
+            await self.open(run, action.zone_id)
+        elif action.action == ACTION_CLOSE:
+            await self.close(run, action.zone_id)
+        elif action.action == ACTION_STEP:
+            self.change_step(run, action.step_idx)
+
+    async def apply_all(
+        self, run: ProgramRun, actions: List[PlanAction], epoch: int
+    ) -> bool:
+        """
+        Apply actions in order, advancing the run's position, consecutive opens
+        or closes of zones that are not masters are switched together. Returns
+        False, leaving the rest unapplied, once the run is no longer current
+        """
+        masters = run.plan.masters
+        batch: List[int] = []
+        kind = None
+        for action in actions:
+            batchable = action.action in (ACTION_OPEN, ACTION_CLOSE) and (
+                action.zone_id not in masters
             )
+            if batch and not (batchable and action.action == kind):
+                await self._apply_batch(run, kind, batch)
+                if not self.is_current(run, epoch):
+                    return False
+                run.position += len(batch)
+                batch = []
+            if batchable:
+                batch.append(action.zone_id)
+                kind = action.action
+            else:
+                await self.apply(run, action)
+                if not self.is_current(run, epoch):
+                    return False
+                run.position += 1
+        await self._apply_batch(run, kind, batch)
+        if not self.is_current(run, epoch):
+            return False
+        run.position += len(batch)
+        return True
+
+    async def _apply_batch(
+        self, run: ProgramRun, kind: Optional[str], zone_ids: List[int]
+    ) -> None:
+        if not zone_ids:
             return
-        first = mzs[0]
-        _LOGGER.debug("Opening first master zone %d", first.id)
-        await self.ow.zones.controller.open_zone(first.id)
-        for mz in mzs[1:]:
-            diff = first.open_offset - mz.open_offset
-            _LOGGER.debug("Opening master %d in %d seconds", mz.id, diff)
-            self.ow.run_coroutine_in(
-                self.ow.zones.controller.open_zone(mz.id), diff,
+        zones = self.ow.zones.controller
+        if kind == ACTION_OPEN:
+            _LOGGER.debug("Opening zones %s", zone_ids)
+            await zones.open_zones(zone_ids, open_master=False)
+            run.open_zones.update(zone_ids)
+        else:
+            _LOGGER.debug("Closing zones %s", zone_ids)
+            await zones.close_zones(zone_ids, close_master=False)
+            run.open_zones.difference_update(zone_ids)
+
+    async def open(self, run: ProgramRun, zone_id: int) -> None:
+        """
+        Open a zone of the plan. Masters are leased by the program, and zones
+        are opened without their masters, which the plan already opened
+        """
+        _LOGGER.debug("Opening zone %d", zone_id)
+        zones = self.ow.zones.controller
+        if zone_id in run.plan.masters:
+            await zones.acquire_master(zone_id, run.holder)
+        else:
+            await zones.open_zone(zone_id, open_master=False)
+        run.open_zones.add(zone_id)
+
+    async def close(self, run: ProgramRun, zone_id: int) -> None:
+        """Close a zone of the plan, its close offset is part of the plan"""
+        _LOGGER.debug("Closing zone %d", zone_id)
+        zones = self.ow.zones.controller
+        if zone_id in run.plan.masters:
+            await zones.release_master(zone_id, run.holder)
+        else:
+            await zones.close_zone(zone_id, close_master=False)
+        run.open_zones.discard(zone_id)
+
+    def change_step(self, run: ProgramRun, step_idx: int) -> None:
+        now = self.ow.clock.now()
+        if run.step is not None:
+            run.step.end(now)
+            _LOGGER.debug("Program step %d finished", run.step_idx)
+        steps = run.plan.steps
+        if step_idx >= len(steps):
+            run.step = None
+            self.checkpoint()
+            return
+        run.step_idx = step_idx
+        run.step = steps[step_idx]
+        run.step.start(now)
+        _LOGGER.debug("Program step %d started", step_idx)
+        self.checkpoint()
+
+    async def seek(self, run: ProgramRun, offset: float) -> None:
+        """
+        Continue a run from offset seconds into its plan: zones that should not
+        be open at offset are closed, the ones that should are opened, masters
+        first, and the step running at offset is started with its elapsed time
+        """
+        self.cancel_timers(run)
+        epoch = run.epoch
+        position, zones, step_idx = run.plan.state_at(offset)
+        run.position = position
+        run.origin = self.ow.event_loop.time() - offset
+        async with run.lock:
+            await self._set_zones(run, zones)
+        if not self.is_current(run, epoch):
+            return
+        if step_idx is not None and (run.step is None or step_idx != run.step_idx):
+            self.change_step(run, step_idx)
+        if run.step is not None:
+            elapsed = offset - run.plan.step_offset(run.step_idx)
+            run.step.started_at = self.ow.clock.now() - timedelta(seconds=elapsed)
+            run.step.run_until = run.step.started_at + timedelta(
+                seconds=run.step.duration
             )
-        _LOGGER.debug("Waiting %d seconds to open zones", first.open_offset)
-        await asyncio.sleep(first.open_offset)
-        _LOGGER.debug("Opening zones %s", ",".join([str(z.id) for z in step.zones]))
-        await asyncio.gather(
-            *[self.ow.zones.controller.open_zone(zone.id) for zone in step.zones]
-        )
+        await self.execute_due(run, epoch)
 
-    async def next_step(self):
-        _LOGGER.debug("Running next step")
-        next_step_idx = (
-            self.current_step_idx + 1 if self.current_step_idx is not None else 0
+    async def _set_zones(self, run: ProgramRun, zones: Set[int]) -> None:
+        masters = run.plan.masters
+        await self._apply_batch(
+            run, ACTION_CLOSE, sorted(run.open_zones - zones - masters)
         )
-        if len(self.current_program.steps) <= next_step_idx:
-            _LOGGER.debug("No next step - program complete")
-            self.program_complete()
+        for zone_id in sorted(run.open_zones - zones):
+            await self.close(run, zone_id)
+        for zone_id in sorted((zones - run.open_zones) & masters):
+            await self.open(run, zone_id)
+        await self._apply_batch(run, ACTION_OPEN, sorted(zones - run.open_zones))
+
+    def _get_run(self, program_id: int) -> ProgramRun:
+        run = self.runs.get(program_id)
+        if run is None or run.plan is None:
+            raise ProgramException("Program {} is not running".format(program_id))
+        return run
+
+    async def pause(self, program_id: int) -> ProgramRun:
+        """Close the zones of a running program and stop its timeline"""
+        run = self._get_run(program_id)
+        if run.paused:
+            return run
+        self.cancel_timers(run)
+        run.paused_at = self.ow.event_loop.time() - run.origin
+        async with run.lock:
+            await self._set_zones(run, set())
+        _LOGGER.info("Paused program %d at %.0f sec", program_id, run.paused_at)
+        self.checkpoint()
+        self.ow.bus.fire(EVENT_PROGRAM_STATE, run.program)
+        return run
+
+    async def resume(self, program_id: int) -> ProgramRun:
+        """Continue a paused program where it stopped"""
+        run = self._get_run(program_id)
+        if not run.paused:
+            return run
+        offset, run.paused_at = run.paused_at, None
+        _LOGGER.info("Resuming program %d at %.0f sec", program_id, offset)
+        await self.seek(run, offset)
+        self.checkpoint()
+        self.ow.bus.fire(EVENT_PROGRAM_STATE, run.program)
+        return run
+
+    async def skip(self, program_id: int) -> ProgramRun:
+        """End the current step early and continue with the next one"""
+        run = self._get_run(program_id)
+        if run.paused:
+            _, _, current = run.plan.state_at(run.paused_at)
+        else:
+            current = None if run.step is None else run.step_idx
+        step_idx = 0 if current is None else current + 1
+        offset = run.plan.step_offset(step_idx)
+        if offset is None:
+            offset = run.plan.duration
+        _LOGGER.info("Skipping program %d to step %d", program_id, step_idx)
+        if run.paused:
+            run.paused_at = offset
+            self.change_step(run, step_idx)
+        else:
+            await self.seek(run, offset)
+        return run
+
+    def snapshot(self) -> dict:
+        now = self.ow.clock.now()
+        loop_time = self.ow.event_loop.time()
+        runs = []
+        for run in self.runs.values():
+            if run.plan is None:
+                continue
+            elapsed = run.paused_at if run.paused else loop_time - run.origin
+            runs.append(
+                {
+                    "program_id": run.program.id,
+                    "schedule_id": run.schedule_id,
+                    "priority": run.priority,
+                    "step_idx": run.step_idx,
+                    "step_deadline": (
+                        run.step.run_until.isoformat() if run.step else None
+                    ),
+                    "origin": (now - timedelta(seconds=elapsed)).isoformat(),
+                    "paused_offset": run.paused_at,
+                }
+            )
+        return {"runs": runs}
+
+    @nonblocking
+    def checkpoint(self) -> None:
+        """
+        Persist the state of every run. Only called on transitions, and at
+        most one write is in flight: a newer snapshot taken while writing
+        replaces any older one still waiting
+        """
+        if self.state is None:
             return
-        next_step = self.current_program.steps[next_step_idx]
-        await self.start_step(next_step)
-        next_step.start()
-        if self.current_step:
-            _LOGGER.debug("Current: %d - Next: %d", self.current_step.id, next_step.id)
-        self.current_step_idx = next_step_idx
-        self.current_step = next_step
-        if self.remove_listener_sec is None:
-            self.remove_listener_sec = self.ow.bus.listen(
-                EVENT_TIMER_TICK_SEC, self.check_progress
+        with self._checkpoint_lock:
+            self._checkpoint = self.snapshot()
+            if self._writing:
+                return
+            self._writing = True
+        self.ow.add_job(self._write_checkpoints)
+
+    def _write_checkpoints(self) -> None:
+        while True:
+            with self._checkpoint_lock:
+                data, self._checkpoint = self._checkpoint, None
+                if data is None:
+                    self._writing = False
+                    return
+            self.state.write(data)
+
+    async def reconcile(self, event: "Event") -> None:
+        """
+        Close the zones of programs that were running when the process stopped,
+        then abort them or resume them where they were, per configured policy
+        """
+        if self.state is None:
+            return
+        state = await self.ow.add_job(self.state.read) or {}
+        saved = state.get("runs") or []
+        if not saved:
+            return
+
+        now = self.ow.clock.now()
+        policy = self.config.get("interrupted_policy", DEFAULT_INTERRUPTED_POLICY)
+        window = self.config.get("interrupted_window", DEFAULT_INTERRUPTED_WINDOW)
+        if policy not in (INTERRUPTED_ABORT, INTERRUPTED_RESUME):
+            _LOGGER.error("Unknown interrupted program policy: %s", policy)
+            policy = INTERRUPTED_ABORT
+
+        for entry in saved:
+            program = self.ow.programs.store.get(entry.get("program_id"))
+            if program is None:
+                continue
+            await self._close_program_zones(program)
+            paused_offset = entry.get("paused_offset")
+            try:
+                origin = datetime.fromisoformat(entry["origin"])
+                offset = (now - origin).total_seconds()
+            except (KeyError, TypeError, ValueError):
+                offset = None
+            if paused_offset is not None:
+                # Nothing watered while paused, so the run stays paused
+                offset = paused_offset
+            elif offset is not None and offset > window * 60:
+                offset = None
+
+            if policy == INTERRUPTED_ABORT or offset is None:
+                _LOGGER.warning(
+                    "Aborted program %d interrupted at step %s",
+                    program.id,
+                    entry.get("step_idx"),
+                )
+                continue
+            if offset >= compile_plan(program).duration:
+                _LOGGER.info("Interrupted program %d had finished", program.id)
+                continue
+            _LOGGER.info(
+                "Resuming interrupted program %d at %.0f sec", program.id, offset
+            )
+            self.ow.programs.queue.submit(
+                program,
+                entry.get("schedule_id"),
+                entry.get("priority") or 0,
+                offset=offset,
+                paused=paused_offset is not None,
             )
+        self.checkpoint()
+
+    async def _close_program_zones(self, program: BaseProgram) -> None:
+        zones = [z.id for step in program.steps for z in step.zones or []]
+        zones += [mz.id for mz in program.master_zones]
+        for zone_id in dict.fromkeys(zones):
+            await self.ow.zones.controller.close_zone(zone_id)
@@ -1,7 +1,7 @@
 import logging
-from typing import TYPE_CHECKING, Collection, Any
+from typing import TYPE_CHECKING, Collection, Any, Iterable
 
-from databases.core import Transaction
+from databases import Database
 
 from openwater.database import model
 from openwater.database.model import program_step, program_step_zones
@@ -14,6 +14,19 @@ if TYPE_CHECKING:
 _LOGGER = logging.getLogger(__name__)
 
 
+def link_step_zones(
+    ow: "OpenWater", step: ProgramStep, zone_ids: Iterable[int]
+) -> None:
+    """Point a step at its zones, leaving out zones that were not loaded"""
+    step.zones = []
+    for zone_id in zone_ids:
+        zone = ow.zones.store.get(zone_id)
+        if zone is None:
+            _LOGGER.warning("Step %s references missing zone %d", step.id, zone_id)
+            continue
+        step.zones.append(zone)
+
+
 async def load_programs(ow: "OpenWater"):
     if not ow.db:
         raise OWError("OpenWater database not initialized")
@@ -22,9 +35,9 @@ async def load_programs(ow: "OpenWater"):
     ow.programs.store.set_steps(steps)
     step_zones: Any = await ow.db.list(model.program_step_zones)
     for step in steps:
-        step.zones = [
-            ow.zones.store.get(sz.zone_id) for sz in step_zones if sz.step_id == step.id
-        ]
+        link_step_zones(
+            ow, step, (sz.zone_id for sz in step_zones if sz.step_id == step.id)
+        )
 
     programs: Any = await ow.db.list(model.program)
 
@@ -41,33 +54,42 @@ async def load_programs(ow: "OpenWater"):
 
 
 async def insert_program(ow: "OpenWater", data: dict) -> int:
-    tx = await ow.db.connection.transaction()
     steps = data.pop("steps")
-    res = await ow.db.insert(model.program, data)
 
-    for s in steps:
-        if await insert_step(ow, s, res) == -1:
-            await tx.rollback()
-            return 0
+    async def _insert(_: Database) -> int:
+        res = await ow.db.insert(model.program, data)
+        for s in steps:
+            if await insert_step(ow, s, res) == -1:
+                raise OWError("Failed to insert program steps")
+        return res
 
-    await tx.commit()
-    return res
+    try:
+        return await ow.db.write(_insert)
+    except OWError as e:
+        _LOGGER.error(e)
+        return 0
 
 
 async def update_program(ow: "OpenWater", data: dict) -> bool:
-    tx = await ow.db.connection.transaction()
     steps = data.pop("steps")
-    res = await ow.db.update(model.program, data)
-    if not res:
-        await tx.rollback()
+
+    async def _update(_: Database) -> bool:
+        if not await ow.db.update(model.program, data):
+            raise OWError("Failed to update program {}".format(data["id"]))
+        for s in steps:
+            if "id" in s:
+                res = await update_step(ow, s)
+            else:
+                res = await insert_step(ow, s, data["id"])
+            if res == -1:
+                raise OWError("Failed to update program steps")
+        return True
+
+    try:
+        return await ow.db.write(_update)
+    except OWError as e:
+        _LOGGER.error(e)
         return False
-    for s in steps:
-        if "id" in s:
-            await update_step(ow, s)
-        else:
-            await insert_step(ow, s, data["id"])
-    await tx.commit()
-    return True
 
 
 async def delete_program(ow: "OpenWater", id_: int) -> int:
@@ -82,14 +104,17 @@ async def get_program_schedules(ow: "OpenWater", program_id: int) -> Collection[
 
 
 async def insert_steps(ow: "OpenWater", data: list) -> bool:
-    tx: Transaction = await ow.db.connection.transaction()
-    for step in data:
-        res = await insert_step(ow, step)
-        if res == -1:
-            await tx.rollback()
-            return False
-    await tx.commit()
-    return True
+    async def _insert(_: Database) -> bool:
+        for step in data:
+            if await insert_step(ow, step) == -1:
+                raise OWError("Failed to insert steps")
+        return True
+
+    try:
+        return await ow.db.write(_insert)
+    except OWError as e:
+        _LOGGER.error(e)
+        return False
 
 
 async def insert_step(ow: "OpenWater", data: dict, program_id: int = None) -> int:
@@ -100,20 +125,24 @@ async def insert_step(ow: "OpenWater", data: dict, program_id: int = None) -> in
         id_ = await ow.db.insert(program_step, data)
         for zone in zones:
             await ow.db.insert(program_step_zones, {"step_id": id_, "zone_id": zone})
+        return id_
     except Exception as e:
         _LOGGER.error("Error inserting step: %s", e)
         return -1
 
 
 async def update_steps(ow: "OpenWater", data: list) -> bool:
-    tx: Transaction = await ow.db.connection.transaction()
-    for step in data:
-        res = await update_step(ow, step)
-        if res == -1:
-            await tx.rollback()
-            return False
-    await tx.commit()
-    return True
+    async def _update(_: Database) -> bool:
+        for step in data:
+            if await update_step(ow, step) == -1:
+                raise OWError("Failed to update steps")
+        return True
+
+    try:
+        return await ow.db.write(_update)
+    except OWError as e:
+        _LOGGER.error(e)
+        return False
 
 
 async def update_step(ow: "OpenWater", data: dict) -> int:
@@ -1,7 +1,7 @@
 import logging
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import Collection, Optional, List
+from typing import Collection, Optional, List, Tuple
 
 from openwater.zone.model import BaseZone
 
@@ -15,7 +15,10 @@ class BaseProgram(ABC):
         self.id = id
         self.name = name
         self.is_running = False
+        self.next_run: Optional[dict] = None
         self._steps = steps if steps else list()
+        self._sorted_steps: Optional[Tuple["ProgramStep", ...]] = None
+        self._master_zones: Optional[Tuple[BaseZone, ...]] = None
 
     def to_dict(self) -> dict:
         return {
@@ -24,6 +27,7 @@ class BaseProgram(ABC):
             "program_type": self.program_type(),
             "is_running": self.is_running,
             "steps": [s.id for s in self.steps],
+            "next_run": self.next_run,
             "attrs": {},
         }
 
@@ -31,12 +35,40 @@ class BaseProgram(ABC):
         return {"id": self.id, "name": self.name, "program_type": self.program_type}
 
     @property
-    def steps(self):
-        return sorted(self._steps, key=lambda step: step.order)
+    def steps(self) -> Tuple["ProgramStep", ...]:
+        if self._sorted_steps is None:
+            self._sorted_steps = tuple(sorted(self._steps, key=lambda s: s.order))
+        return self._sorted_steps
 
     @steps.setter
     def steps(self, steps):
         self._steps = steps
+        self.invalidate()
+
+    def layout(self) -> List[Tuple[int, "ProgramStep"]]:
+        """Start offset of each step in seconds, in start order"""
+        res = []
+        t = 0
+        for step in self.steps:
+            res.append((t, step))
+            t += step.duration
+        return res
+
+    @property
+    def master_zones(self) -> Tuple[BaseZone, ...]:
+        """Every master zone used by any step, without duplicates"""
+        if self._master_zones is None:
+            self._master_zones = tuple(
+                dict.fromkeys(mz for step in self.steps for mz in step.master_zones)
+            )
+        return self._master_zones
+
+    def invalidate(self) -> None:
+        """Drop cached step order and master zones after steps or zones change"""
+        self._sorted_steps = None
+        self._master_zones = None
+        for step in self._steps:
+            step.invalidate()
 
     @staticmethod
     @abstractmethod
@@ -59,13 +91,26 @@ class ProgramStep:
         self.duration = duration
         self.order = order
         self.program_id = program_id
-        self.zones = zones
+        self._zones = zones
+        self._master_zones: Optional[Tuple[BaseZone, ...]] = None
         self.running = False
         self.done = False
         self.started_at: Optional[datetime] = None
         self.run_until: Optional[datetime] = None
         self.completed_at: Optional[datetime] = None
 
+    @property
+    def zones(self) -> Optional[Collection[BaseZone]]:
+        return self._zones
+
+    @zones.setter
+    def zones(self, zones: Optional[Collection[BaseZone]]) -> None:
+        self._zones = zones
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        self._master_zones = None
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -83,64 +128,72 @@ class ProgramStep:
             "program_id": self.program_id,
         }
 
-    def start(self) -> None:
+    def reset(self) -> None:
+        self.running = False
+        self.done = False
+        self.started_at = None
+        self.run_until = None
+        self.completed_at = None
+
+    def start(self, now: datetime) -> None:
         self.running = True
-        self.started_at = datetime.now()
+        self.started_at = now
         self.run_until = self.started_at + timedelta(seconds=self.duration)
         _LOGGER.debug("Starting step: %s", self.to_dict())
 
-    def end(self) -> None:
+    def end(self, now: datetime) -> None:
         self.running = False
         self.done = True
-        self.completed_at = datetime.now()
+        self.completed_at = now
 
-    def is_complete(self):
+    def is_complete(self, now: datetime):
         if self.done:
             return True
-        now = datetime.now()
         return (self.run_until - now).total_seconds() < 1
 
-    def check_open_master_zones(self):
+    def check_open_master_zones(self, now: datetime):
         res = []
         for mz in self.master_zones:
             if mz.open_offset <= 0 or mz.is_open():
                 continue
-            if self.time_elapsed >= mz.open_offset:
+            if self.time_elapsed(now) >= mz.open_offset:
                 res.append(mz.id)
         _LOGGER.debug("Checked master zones to open: %s", res)
         return res
 
-    def check_close_master_zones(self, next_step_zones):
+    def check_close_master_zones(self, next_step_zones, now: datetime):
         next_ids = [zone.id for zone in next_step_zones]
         res = []
         for mz in self.master_zones:
             if mz.close_offset >= 0 or not mz.is_open():
                 continue
-            if self.time_remaining <= abs(mz.close_offset) and mz.id not in next_ids:
+            if (
+                self.time_remaining(now) <= abs(mz.close_offset)
+                and mz.id not in next_ids
+            ):
                 res.append(mz.id)
         _LOGGER.debug("Checked master zones to close: %s", res)
         return res
 
-    @property
-    def time_remaining(self):
-        t = (self.run_until - datetime.now()).total_seconds()
+    def time_remaining(self, now: datetime):
+        t = (self.run_until - now).total_seconds()
         _LOGGER.debug("Time remaining in program: %d sec", t)
         return t
 
-    @property
-    def time_elapsed(self):
-        t = (datetime.now() - self.started_at).total_seconds()
+    def time_elapsed(self, now: datetime):
+        t = (now - self.started_at).total_seconds()
         _LOGGER.debug("Time elapsed in program: %d sec", t)
         return t
 
     @property
-    def master_zones(self) -> List["BaseZone"]:
-        if self.zones is None:
-            return []
-        l = []
-        for zone in self.zones:
-            if zone.master_zones is None:
-                continue
-            for master in zone.master_zones:
-                l.append(master)
-        return l
+    def master_zones(self) -> Tuple[BaseZone, ...]:
+        """Masters of every zone in this step, without duplicates"""
+        if self._master_zones is None:
+            self._master_zones = tuple(
+                dict.fromkeys(
+                    master
+                    for zone in self._zones or []
+                    for master in zone.master_zones or []
+                )
+            )
+        return self._master_zones
@@ -0,0 +1,124 @@
+import bisect
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from openwater.program.model import ProgramStep
+
+Layout = List[Tuple[int, ProgramStep]]
+
+FLOW_TOLERANCE = 1e-9
+
+
+def step_flow(step: ProgramStep) -> Optional[float]:
+    """Combined flow rate of a step's zones, None if any zone has no flow rate"""
+    total = 0.0
+    for zone in step.zones or []:
+        flow = (zone.attrs or {}).get("flow_rate")
+        if flow is None:
+            return None
+        total += flow
+    return total
+
+
+def pack_steps(steps: Sequence[ProgramStep], max_flow: float) -> Layout:
+    """
+    Run steps concurrently while their combined flow stays within max_flow.
+    Steps without zones, such as soak or wait steps, are barriers: they start
+    once every earlier step has finished, and later steps start after them.
+    Between barriers, first fit decreasing: the longest steps are placed
+    first, each at the earliest time the flow in use leaves room for it over
+    its whole duration and none of its zones is already running. Steps whose
+    flow is unknown or larger than max_flow run alone. Returns (start offset,
+    step) in start order
+    """
+    res: Layout = []
+    start = 0
+    group: List[ProgramStep] = []
+    for step in sorted(steps, key=lambda s: s.order):
+        if step.zones:
+            group.append(step)
+            continue
+        start = _pack_group(group, max_flow, start, res)
+        res.append((start, step))
+        start += step.duration
+        group = []
+    _pack_group(group, max_flow, start, res)
+
+    res.sort(key=lambda entry: (entry[0], entry[1].order))
+    return res
+
+
+def _pack_group(
+    steps: List[ProgramStep], max_flow: float, offset: int, res: Layout
+) -> int:
+    """Pack steps from offset into res, returns the time the last one ends"""
+    # Piecewise constant flow in use: usage[k] applies from times[k] until
+    # times[k + 1], the last segment is open ended and always empty
+    times: List[int] = [0]
+    usage: List[float] = [0.0]
+    busy: Dict[int, List[Tuple[int, int]]] = {}
+    end = 0
+
+    for step in sorted(steps, key=lambda s: (-s.duration, s.order)):
+        flow = step_flow(step)
+        if flow is None or flow > max_flow:
+            flow = max_flow
+        zone_ids = [z.id for z in step.zones or []]
+        start = _first_fit(times, usage, busy, zone_ids, step.duration, flow, max_flow)
+        step_end = start + step.duration
+        _reserve(times, usage, start, step_end, flow)
+        for zone_id in zone_ids:
+            busy.setdefault(zone_id, []).append((start, step_end))
+        res.append((offset + start, step))
+        end = max(end, step_end)
+    return offset + end
+
+
+def _first_fit(
+    times: List[int],
+    usage: List[float],
+    busy: Dict[int, List[Tuple[int, int]]],
+    zone_ids: List[int],
+    duration: int,
+    flow: float,
+    max_flow: float,
+) -> int:
+    i = 0
+    while True:
+        start = times[i]
+        end = start + duration
+        j = i
+        while (
+            j < len(times)
+            and times[j] < end
+            and usage[j] + flow <= max_flow + FLOW_TOLERANCE
+        ):
+            j += 1
+        if j < len(times) and times[j] < end:
+            # Flow exceeded in segment j, no start before it ends can fit
+            i = j + 1
+            continue
+        blocked = max(
+            [e for z in zone_ids for s, e in busy.get(z, []) if s < end and e > start],
+            default=None,
+        )
+        if blocked is None:
+            return start
+        i = bisect.bisect_left(times, blocked)
+
+
+def _split(times: List[int], usage: List[float], t: int) -> int:
+    """Index of the segment starting at t, splitting the one containing it"""
+    k = bisect.bisect_left(times, t)
+    if k == len(times) or times[k] != t:
+        times.insert(k, t)
+        usage.insert(k, usage[k - 1])
+    return k
+
+
+def _reserve(
+    times: List[int], usage: List[float], start: int, end: int, flow: float
+) -> None:
+    lo = _split(times, usage, start)
+    hi = _split(times, usage, end)
+    for k in range(lo, hi):
+        usage[k] += flow
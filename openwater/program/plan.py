@@ -0,0 +1,165 @@
+import bisect
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from openwater.program.model import BaseProgram, ProgramStep
+from openwater.zone.model import BaseZone
+
+ACTION_OPEN = "open"
+ACTION_CLOSE = "close"
+ACTION_STEP = "step"
+
+Window = Tuple[int, int]
+
+
+class PlanAction(NamedTuple):
+    at: int  # seconds from program start
+    action: str
+    zone_id: Optional[int] = None
+    step_idx: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "at": self.at,
+            "action": self.action,
+            "zone_id": self.zone_id,
+            "step_idx": self.step_idx,
+        }
+
+
+class ExecutionPlan:
+    """
+    Every valve action of a program run as an offset from the program start.
+    ACTION_STEP markers start step `step_idx` of `steps` and end the one
+    before it, the last marker (step_idx == number of steps) only ends the
+    final step. When steps overlap, the current step is the last one started
+    """
+
+    def __init__(
+        self,
+        program_id: int,
+        actions: List[PlanAction],
+        steps: Sequence[ProgramStep] = (),
+        masters: FrozenSet[int] = frozenset(),
+    ):
+        self.program_id = program_id
+        self.actions = actions
+        self.steps = steps
+        self.masters = masters
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    @property
+    def duration(self) -> int:
+        return self.actions[-1].at if self.actions else 0
+
+    def state_at(self, offset: float) -> Tuple[int, Set[int], Optional[int]]:
+        """
+        Position of the first action after offset, the zones open at offset and
+        the step running at offset
+        """
+        position = bisect.bisect_right([a.at for a in self.actions], offset)
+        zones: Set[int] = set()
+        step_idx = None
+        for action in self.actions[:position]:
+            if action.action == ACTION_OPEN:
+                zones.add(action.zone_id)
+            elif action.action == ACTION_CLOSE:
+                zones.discard(action.zone_id)
+            else:
+                step_idx = action.step_idx
+        return position, zones, step_idx
+
+    def step_offset(self, step_idx: int) -> Optional[int]:
+        """Offset of the marker starting step_idx"""
+        for action in self.actions:
+            if action.action == ACTION_STEP and action.step_idx == step_idx:
+                return action.at
+        return None
+
+    def zone_windows(self) -> Dict[int, List[Window]]:
+        """Open intervals of every zone, in order"""
+        opened: Dict[int, int] = {}
+        res: Dict[int, List[Window]] = {}
+        for action in self.actions:
+            if action.action == ACTION_OPEN:
+                opened[action.zone_id] = action.at
+            elif action.action == ACTION_CLOSE:
+                start = opened.pop(action.zone_id)
+                res.setdefault(action.zone_id, []).append((start, action.at))
+        return res
+
+    def to_dict(self) -> dict:
+        return {
+            "program_id": self.program_id,
+            "duration": self.duration,
+            "actions": [a.to_dict() for a in self.actions],
+        }
+
+
+def _merge(windows: List[Window]) -> List[Window]:
+    """Join windows that touch or overlap"""
+    res: List[Window] = []
+    for start, end in sorted(windows):
+        if res and start <= res[-1][1]:
+            res[-1] = (res[-1][0], max(res[-1][1], end))
+        else:
+            res.append((start, end))
+    return res
+
+
+def compile_plan(program: BaseProgram) -> ExecutionPlan:
+    """
+    Lay out a program as a valve action timeline. Steps start at the offsets
+    of the program layout, back to back unless the program runs some of them
+    concurrently: masters needed by a step open during the tail of the step
+    before it, and masters or zones used by consecutive or overlapping steps,
+    or whose close offset reaches their next use, stay open
+    """
+    layout = program.layout()
+    starts = [start for start, _ in layout]
+    steps = [step for _, step in layout]
+    end = max([start + step.duration for start, step in layout], default=0)
+
+    windows: Dict[int, List[Window]] = {}
+    uses: Dict[BaseZone, List[Window]] = {}
+    for idx, step in enumerate(steps):
+        step_window = (starts[idx], starts[idx] + step.duration)
+        for zone in step.zones or []:
+            windows.setdefault(zone.id, []).append(step_window)
+        for mz in step.master_zones:
+            uses.setdefault(mz, []).append(step_window)
+
+    master_ids: Set[int] = {mz.id for mz in uses}
+    for mz, mz_uses in uses.items():
+        open_offset, close_offset = mz.open_offset or 0, mz.close_offset or 0
+        windows.setdefault(mz.id, []).extend(
+            (start - open_offset, max(start, stop + close_offset))
+            for start, stop in _merge(mz_uses)
+        )
+
+    # Shift everything so no master has to open before the program starts
+    lead = max([0] + [-start for ws in windows.values() for start, _ in ws])
+
+    actions: List[PlanAction] = []
+    for zone_id, zone_windows in windows.items():
+        for start, stop in _merge(zone_windows):
+            if stop <= start:
+                continue
+            actions.append(PlanAction(start + lead, ACTION_OPEN, zone_id))
+            actions.append(PlanAction(stop + lead, ACTION_CLOSE, zone_id))
+    for idx, start in enumerate(starts + [end]):
+        actions.append(PlanAction(start + lead, ACTION_STEP, step_idx=idx))
+
+    def order(action: PlanAction) -> Tuple[int, int]:
+        is_master = action.zone_id in master_ids
+        if action.action == ACTION_CLOSE:
+            rank = 1 if is_master else 0
+        elif action.action == ACTION_STEP:
+            rank = 2
+        else:
+            rank = 3 if is_master else 4
+        return action.at, rank
+
+    actions.sort(key=order)
+    return ExecutionPlan(program.id, actions, steps, frozenset(master_ids))
@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from openwater.constants import EVENT_PROGRAM_COMPLETED, EVENT_RUN_QUEUE
+from openwater.program.controller import ProgramRun
+from openwater.program.model import BaseProgram
+from openwater.program.plan import ACTION_CLOSE, ACTION_OPEN, compile_plan
+from openwater.utils.decorator import nonblocking
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater, Event
+
+_LOGGER = logging.getLogger(__name__)
+
+DECISION_QUEUED = "queued"
+DECISION_STARTED = "started"
+DECISION_WAITING = "waiting"
+DECISION_DUPLICATE = "duplicate"
+
+REASON_ZONE_CONFLICT = "zone_conflict"
+REASON_FLOW_BUDGET = "flow_budget"
+
+
+def program_zone_ids(program: BaseProgram) -> Set[int]:
+    """
+    Ids of every zone a program waters. Master zones are leased, so programs
+    sharing one can run at the same time
+    """
+    res = set()
+    for step in program.steps:
+        res.update(z.id for z in step.zones or [])
+    return res
+
+
+def program_peak_flow(program: BaseProgram) -> float:
+    """Highest combined flow rate of the zones a program has open at once"""
+    flows = {
+        z.id: (z.attrs or {}).get("flow_rate") or 0
+        for step in program.steps
+        for z in step.zones or []
+    }
+    current = peak = 0
+    for action in compile_plan(program).actions:
+        if action.action == ACTION_OPEN:
+            current += flows.get(action.zone_id, 0)
+            peak = max(peak, current)
+        elif action.action == ACTION_CLOSE:
+            current -= flows.get(action.zone_id, 0)
+    return peak
+
+
+class RunQueue:
+    """
+    Accepts program runs with priorities and starts every run whose zones do not
+    conflict with a running program and whose flow fits in the remaining budget.
+    Anything else waits in priority order until a running program completes
+    """
+
+    def __init__(self, ow: "OpenWater"):
+        self._ow = ow
+        self._seq = itertools.count()
+        self._pending: List[Tuple[int, int, ProgramRun]] = []
+        self._waiting_reason: Dict[int, str] = {}
+        self.running: Dict[int, ProgramRun] = {}
+        ow.bus.listen(EVENT_PROGRAM_COMPLETED, self.program_complete)
+
+    @property
+    def max_flow(self) -> Optional[float]:
+        return ((self._ow.config or {}).get("scheduler") or {}).get("max_flow")
+
+    @property
+    def pending(self) -> List[ProgramRun]:
+        return [run for _, _, run in sorted(self._pending)]
+
+    def to_dict(self) -> dict:
+        return {
+            "running": list(self.running.values()),
+            "pending": self.pending,
+            "max_flow": self.max_flow,
+        }
+
+    @nonblocking
+    def submit(
+        self,
+        program: BaseProgram,
+        schedule_id: Optional[int] = None,
+        priority: int = 0,
+        offset: float = 0,
+        paused: bool = False,
+    ) -> ProgramRun:
+        """
+        Queue a program run and start it if capacity allows
+        :param offset: seconds into the program to start at, when resuming
+        :param paused: start the run paused at offset
+        """
+        for run in itertools.chain(self.running.values(), self.pending):
+            if run.program.id == program.id:
+                _LOGGER.debug("Program %d already queued or running", program.id)
+                self._fire(run, DECISION_DUPLICATE)
+                return run
+
+        run = ProgramRun(program, schedule_id, priority, offset)
+        if paused:
+            run.paused_at = offset
+        run.queued_at = self._ow.clock.now()
+        heapq.heappush(self._pending, (-priority, next(self._seq), run))
+        self._fire(run, DECISION_QUEUED)
+        self.dispatch()
+        return run
+
+    @nonblocking
+    def dispatch(self) -> None:
+        """Start pending runs, highest priority first, while capacity allows"""
+        remaining = []
+        while self._pending:
+            entry = heapq.heappop(self._pending)
+            run = entry[2]
+            reason = self._blocked_reason(run)
+            if reason is None:
+                self._start(run)
+                continue
+            remaining.append(entry)
+            if self._waiting_reason.get(id(run)) != reason:
+                self._waiting_reason[id(run)] = reason
+                self._fire(run, DECISION_WAITING, reason)
+        for entry in remaining:
+            heapq.heappush(self._pending, entry)
+
+    @nonblocking
+    def program_complete(self, event: "Event") -> None:
+        program: BaseProgram = event.data["program"]
+        if self.running.pop(program.id, None) is None:
+            _LOGGER.error("Completed program %d was not started by queue", program.id)
+        self.dispatch()
+
+    def _start(self, run: ProgramRun) -> None:
+        run.started_at = self._ow.clock.now()
+        self._waiting_reason.pop(id(run), None)
+        self.running[run.program.id] = run
+        self._fire(run, DECISION_STARTED)
+        _LOGGER.debug(
+            "Starting program %d for schedule %s", run.program.id, run.schedule_id
+        )
+        self._ow.fire_coroutine(self._ow.programs.controller.run_program(run))
+
+    def _blocked_reason(self, run: ProgramRun) -> Optional[str]:
+        zones = program_zone_ids(run.program)
+        for other in self.running.values():
+            if zones & program_zone_ids(other.program):
+                return REASON_ZONE_CONFLICT
+
+        max_flow = self.max_flow
+        if max_flow is not None and self.running:
+            used = sum(program_peak_flow(r.program) for r in self.running.values())
+            if used + program_peak_flow(run.program) > max_flow:
+                return REASON_FLOW_BUDGET
+        return None
+
+    def _fire(self, run: ProgramRun, decision: str, reason: str = None) -> None:
+        waited = None
+        if run.started_at is not None:
+            waited = (run.started_at - run.queued_at).total_seconds()
+        self._ow.bus.fire(
+            EVENT_RUN_QUEUE,
+            {
+                "run": run,
+                "decision": decision,
+                "reason": reason,
+                "wait": waited,
+                "pending": len(self._pending),
+                "running": len(self.running),
+            },
+        )
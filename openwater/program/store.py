@@ -1,19 +1,16 @@
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Type
 
-from openwater.constants import EVENT_PROGRAM_STATE
+from openwater.constants import EVENT_PROGRAM_STATE, EVENT_ZONE_UPDATED
 from openwater.errors import ProgramException, ProgramValidationException
-from openwater.program.helpers import (
-    insert_program,
-    update_program,
-    delete_program,
-)
+from openwater.program.helpers import insert_program, update_program, delete_program
 from openwater.program.model import BaseProgram, ProgramStep
 from openwater.program.registry import ProgramRegistry
-from openwater.program.validation import validate_program
+from openwater.program.validation import validate_attrs, validate_program
+from openwater.zone.model import BaseZone
 from openwater.utils.decorator import nonblocking
 
 if TYPE_CHECKING:
-    from openwater.core import OpenWater
+    from openwater.core import OpenWater, Event
 
 
 class ProgramStore:
@@ -22,6 +19,7 @@ class ProgramStore:
         self._registry = registry
         self.programs_: dict = dict()
         self.steps_: dict = dict()
+        ow.bus.listen(EVENT_ZONE_UPDATED, self.zones_changed)
 
     @nonblocking
     def to_dict(self):
@@ -62,10 +60,11 @@ class ProgramStore:
         errors = validate_program(data)
         if errors:
             raise ProgramValidationException("Program validation failed", errors)
+        program_type = self._registry.get_program_for_type(data["program_type"])
+        self._validate_attrs(program_type.cls, data)
 
         id_ = await insert_program(self._ow, data)
         data["id"] = id_
-        program_type = self._registry.get_program_for_type(data["program_type"])
         program = program_type.create(self._ow, data)
         self.add(program)
 
@@ -76,15 +75,24 @@ class ProgramStore:
         errors = validate_program(data)
         if errors:
             raise ProgramValidationException("Program validation failed", errors)
+        program_type = self._registry.get_program_for_type(data["program_type"])
+        self._validate_attrs(program_type.cls, data)
 
         await update_program(self._ow, data)
 
-        program_type = self._registry.get_program_for_type(data["program_type"])
         program = program_type.create(self._ow, data)
         self.add(program)
 
         return program
 
+    @staticmethod
+    def _validate_attrs(program_cls: Type[BaseProgram], data: Dict) -> None:
+        errors = validate_attrs(program_cls, data.get("attrs"))
+        if errors:
+            raise ProgramValidationException(
+                "Program attribute validation failed", {"attrs": errors}
+            )
+
     async def delete(self, program_id: int):
         """Delete a program from the store and remove database record"""
         success = delete_program(self._ow, program_id)
@@ -94,3 +102,26 @@ class ProgramStore:
 
     def set_steps(self, steps: List[ProgramStep]) -> None:
         self.steps_ = {s.id: s for s in steps}
+
+    @nonblocking
+    def zones_changed(self, event: "Event") -> None:
+        """
+        Zones are replaced in the zone store on update, so point the steps of
+        affected programs at the current zone objects and drop their caches
+        """
+        if isinstance(event.data, BaseZone):
+            zone_id = event.data.id
+        else:
+            zone_id = event.data.get("zone_id")
+        zones = self._ow.zones.store
+        for program in self.programs_.values():
+            uses = {z.id for step in program.steps for z in step.zones or []}
+            uses.update(mz.id for mz in program.master_zones)
+            if zone_id not in uses:
+                continue
+            for step in program.steps:
+                if step.zones:
+                    current = (zones.get(z.id) for z in step.zones)
+                    step.zones = [z for z in current if z is not None]
+            program.invalidate()
+            self._ow.bus.fire(EVENT_PROGRAM_STATE, program)
@@ -1,8 +1,10 @@
-from typing import Optional
+from typing import Optional, Type
 
 from cerberus import Validator
 from cerberus.errors import ErrorList
 
+from openwater.program.model import BaseProgram
+
 STEP_SCHEMA = {
     "id": {"type": "integer", "nullable": True},
     "program_id": {"type": "integer", "nullable": True},
@@ -26,3 +28,13 @@ def validate_program(data: dict) -> Optional["ErrorList"]:
     if not validator.validate(data):
         return validator.errors
     return None
+
+
+def validate_attrs(program_cls: Type[BaseProgram], data: dict) -> Optional["ErrorList"]:
+    if not hasattr(program_cls, "ATTR_SCHEMA"):
+        return None
+    validator: Validator = Validator(getattr(program_cls, "ATTR_SCHEMA"))
+    validator.allow_unknown = True
+    if not validator.validate(data or {}):
+        return validator.errors
+    return None
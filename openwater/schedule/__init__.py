@@ -1,5 +1,6 @@
 from typing import TYPE_CHECKING
 
+from openwater.schedule.forecast import Forecast
 from openwater.schedule.store import ScheduleStore
 
 if TYPE_CHECKING:
@@ -9,3 +10,4 @@ if TYPE_CHECKING:
 class ScheduleManager:
     def __init__(self, ow: "OpenWater"):
         self.store = ScheduleStore(ow)
+        self.forecast = Forecast(ow)
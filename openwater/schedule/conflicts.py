@@ -0,0 +1,139 @@
+import logging
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from openwater.program.model import BaseProgram
+from openwater.program.plan import compile_plan
+from openwater.program.queue import program_zone_ids
+from openwater.schedule.model import ProgramSchedule
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONFLICT_DAYS = 14
+
+
+class IntervalTree:
+    """
+    Static interval tree over half-open [start, end) intervals. Intervals are
+    sorted by start and laid out as an implicit balanced binary tree in which
+    every node also holds the largest end of its subtree, so whole subtrees
+    ending before a query are skipped
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        order = np.argsort(starts, kind="stable")
+        self._order = order
+        self._starts = starts[order]
+        self._ends = ends[order]
+        self._max_end = self._ends.copy()
+        self._build(0, len(order))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return np.iinfo(np.int64).min
+        mid = (lo + hi) // 2
+        self._max_end[mid] = max(
+            self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi)
+        )
+        return self._max_end[mid]
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Positions, in the input arrays, of intervals overlapping [start, end)"""
+        res: List[int] = []
+        self._query(0, len(self._order), start, end, res)
+        return res
+
+    def _query(self, lo: int, hi: int, start: int, end: int, res: List[int]):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return
+        self._query(lo, mid, start, end, res)
+        if self._starts[mid] >= end:
+            return
+        if self._ends[mid] > start:
+            res.append(int(self._order[mid]))
+        self._query(mid + 1, hi, start, end, res)
+
+
+def program_run_seconds(program: BaseProgram) -> int:
+    """Expected time from program start until its last master zone closes"""
+    return compile_plan(program).duration
+
+
+def find_conflicts(
+    ow: "OpenWater",
+    start: date,
+    end: date,
+    schedules: Optional[Iterable[ProgramSchedule]] = None,
+    involving: Optional[ProgramSchedule] = None,
+) -> List[dict]:
+    """
+    Find pairs of schedules whose runs overlap in time and share a zone between
+    start and end (inclusive). A schedule paired with itself runs
+    longer than the gap between two of its starts
+    :param schedules: schedules to analyze, defaults to all stored schedules
+    :param involving: only report conflicts with this schedule
+    """
+    if schedules is None:
+        schedules = ow.schedules.store.all
+    schedules = list(schedules)
+    programs = [ow.programs.store.get(s.program_id) for s in schedules]
+    zones = [program_zone_ids(p) if p else set() for p in programs]
+
+    starts, ends, owners = [], [], []
+    for i, (schedule, program) in enumerate(zip(schedules, programs)):
+        if program is None:
+            continue
+        occurrences = schedule.occurrences(start, end)
+        if not occurrences.size:
+            continue
+        begin = occurrences.astype("datetime64[s]").astype(np.int64)
+        starts.append(begin)
+        ends.append(begin + program_run_seconds(program))
+        owners.append(np.full(begin.size, i))
+    if not starts:
+        return []
+
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    owners = np.concatenate(owners)
+    tree = IntervalTree(starts, ends)
+
+    pairs: Dict[Tuple[int, int], dict] = {}
+    for k in range(len(tree)):
+        for j in tree.overlapping(starts[k], ends[k]):
+            if j <= k:
+                continue
+            a, b = sorted((int(owners[k]), int(owners[j])))
+            if involving is not None and involving not in (schedules[a], schedules[b]):
+                continue
+            shared = zones[a] & zones[b]
+            if not shared:
+                continue
+            overlap = int(max(starts[k], starts[j]))
+            conflict = pairs.get((a, b))
+            if conflict is None:
+                pairs[(a, b)] = {
+                    "schedule_ids": [schedules[a].id, schedules[b].id],
+                    "program_ids": [schedules[a].program_id, schedules[b].program_id],
+                    "zones": sorted(shared),
+                    "first": overlap,
+                    "count": 1,
+                }
+            else:
+                conflict["first"] = min(conflict["first"], overlap)
+                conflict["count"] += 1
+
+    for conflict in pairs.values():
+        conflict["first"] = np.datetime64(conflict["first"], "s").astype(datetime)
+    return sorted(pairs.values(), key=lambda c: c["first"])
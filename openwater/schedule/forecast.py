@@ -0,0 +1,163 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+
+from openwater.constants import (
+    EVENT_FORECAST,
+    EVENT_PROGRAM_STATE,
+    EVENT_SCHEDULE_STATE,
+    EVENT_TIMER_TICK_MIN,
+    EVENT_ZONE_UPDATED,
+)
+from openwater.program.model import BaseProgram
+from openwater.program.plan import ExecutionPlan, compile_plan
+from openwater.schedule.model import ProgramSchedule
+from openwater.utils.decorator import nonblocking
+
+if TYPE_CHECKING:
+    from openwater.core import OpenWater, Event
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FORECAST_DAYS = 31
+
+
+def next_start(
+    schedule: ProgramSchedule, now: datetime, days: int = DEFAULT_FORECAST_DAYS
+) -> Optional[datetime]:
+    """First start of schedule after the minute of now, within days"""
+    occurrences = schedule.occurrences(now.date(), now.date() + timedelta(days=days))
+    idx = np.searchsorted(occurrences, np.datetime64(now, "m"), side="right")
+    if idx >= occurrences.size:
+        return None
+    return occurrences[idx].astype(datetime)
+
+
+def zone_timings(plan: ExecutionPlan) -> Dict[int, Tuple[int, int]]:
+    """Seconds from program start until each zone first opens, and its total run time"""
+    return {
+        zone_id: (windows[0][0], sum(end - start for start, end in windows))
+        for zone_id, windows in plan.zone_windows().items()
+    }
+
+
+class Forecast:
+    """
+    Keeps the next run of every program and zone. Each schedule's next start
+    is only recomputed when the schedule is replaced in the store or the start
+    has passed, and program timings only when the program changes
+    """
+
+    def __init__(self, ow: "OpenWater"):
+        self._ow = ow
+        self._starts: Dict[int, Tuple[ProgramSchedule, Optional[datetime], date]] = {}
+        self._timings: Dict[int, Tuple[BaseProgram, int, Dict]] = {}
+        self._earliest: Optional[datetime] = None
+        self.programs: Dict[int, dict] = {}
+        self.zones: Dict[int, dict] = {}
+        ow.bus.listen(EVENT_SCHEDULE_STATE, self.schedules_changed)
+        ow.bus.listen(EVENT_PROGRAM_STATE, self.program_changed)
+        ow.bus.listen(EVENT_ZONE_UPDATED, self.zone_changed)
+        ow.bus.listen(EVENT_TIMER_TICK_MIN, self.check_expired)
+
+    def to_dict(self) -> dict:
+        return {"programs": self.programs, "zones": self.zones}
+
+    @nonblocking
+    def schedules_changed(self, event: "Event") -> None:
+        self.refresh()
+
+    @nonblocking
+    def program_changed(self, event: "Event") -> None:
+        if isinstance(event.data, BaseProgram):
+            self._timings.pop(event.data.id, None)
+        self.refresh()
+
+    @nonblocking
+    def zone_changed(self, event: "Event") -> None:
+        # Zones are replaced in the store on update, so reapply the forecast
+        self.apply()
+
+    @nonblocking
+    def check_expired(self, event: "Event") -> None:
+        now: datetime = event.data["now"]
+        if (self._earliest is not None and self._earliest <= now) or (
+            now.hour == 0 and now.minute == 0
+        ):
+            self.refresh(now)
+
+    def refresh(self, now: Optional[datetime] = None) -> None:
+        now = now or self._ow.clock.now()
+        starts = {}
+        for schedule in self._ow.schedules.store.all:
+            cached = self._starts.get(schedule.id)
+            if cached is None or cached[0] is not schedule or _stale(cached, now):
+                cached = (schedule, next_start(schedule, now), now.date())
+            starts[schedule.id] = cached
+        self._starts = starts
+        self._earliest = min(
+            [start for _, start, _ in starts.values() if start is not None],
+            default=None,
+        )
+
+        programs: Dict[int, dict] = {}
+        zones: Dict[int, dict] = {}
+        for schedule, start, _ in starts.values():
+            if start is None:
+                continue
+            timing = self._program_timing(schedule.program_id)
+            if timing is None:
+                continue
+            duration, zone_times = timing
+            current = programs.get(schedule.program_id)
+            if current is None or start < current["start"]:
+                programs[schedule.program_id] = {
+                    "start": start,
+                    "duration": duration,
+                    "schedule_id": schedule.id,
+                }
+            for zone_id, (offset, zone_duration) in zone_times.items():
+                zone_start = start + timedelta(seconds=offset)
+                current = zones.get(zone_id)
+                if current is None or zone_start < current["start"]:
+                    zones[zone_id] = {
+                        "start": zone_start,
+                        "duration": zone_duration,
+                        "program_id": schedule.program_id,
+                    }
+
+        changed = programs != self.programs or zones != self.zones
+        self.programs = programs
+        self.zones = zones
+        # Programs are replaced in the store on update, so always reapply
+        self.apply()
+        if changed:
+            self._ow.bus.fire(EVENT_FORECAST, self)
+
+    def apply(self) -> None:
+        """Set next_run on the stored programs and zones"""
+        for program in self._ow.programs.store.all:
+            program.next_run = self.programs.get(program.id)
+        for zone in self._ow.zones.store.all:
+            zone.next_run = self.zones.get(zone.id)
+
+    def _program_timing(self, program_id: int) -> Optional[Tuple[int, Dict]]:
+        program = self._ow.programs.store.get(program_id)
+        if program is None:
+            return None
+        cached = self._timings.get(program_id)
+        if cached is None or cached[0] is not program:
+            plan = compile_plan(program)
+            cached = (program, plan.duration, zone_timings(plan))
+            self._timings[program_id] = cached
+        return cached[1], cached[2]
+
+
+def _stale(cached: Tuple[ProgramSchedule, Optional[datetime], date], now) -> bool:
+    """The start has passed, or nothing was found and the horizon has moved"""
+    _, start, computed = cached
+    if start is None:
+        return computed != now.date()
+    return start <= now
@@ -1,5 +1,6 @@
 import logging
-from typing import TYPE_CHECKING, Collection, Any
+from datetime import date
+from typing import TYPE_CHECKING, Collection, Any, List, Optional
 
 from databases.core import Transaction
 
@@ -35,3 +36,23 @@ async def update_schedule(ow: "OpenWater", data):
 
 async def delete_schedule(ow: "OpenWater", schedule_id: int) -> int:
     return await ow.db.delete(model.schedule, schedule_id)
+
+
+def get_occurrences(
+    ow: "OpenWater", start: date, end: date, program_id: Optional[int] = None
+) -> List[dict]:
+    """Expand schedules into their start times between start and end, in order"""
+    res = []
+    for schedule in ow.schedules.store.all:
+        if program_id is not None and schedule.program_id != program_id:
+            continue
+        for dt in schedule.occurrences(start, end).tolist():
+            res.append(
+                {
+                    "schedule_id": schedule.id,
+                    "program_id": schedule.program_id,
+                    "start": dt,
+                }
+            )
+    res.sort(key=lambda o: o["start"])
+    return res
@@ -0,0 +1,91 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from openwater.schedule.model import (
+    MINUTES_PER_DAY,
+    MINUTES_PER_WEEK,
+    ProgramSchedule,
+    week_minute,
+)
+
+
+class ScheduleIndex:
+    """
+    Minute-of-week bitmaps of all schedules stacked into one matrix, so every
+    schedule whose bit is set for a given minute is found with one row lookup
+    """
+
+    def __init__(self, schedules: List[ProgramSchedule]):
+        self.schedules = list(schedules)
+        if self.schedules:
+            self._matrix = np.stack(
+                [s.compiled.week_mask for s in self.schedules], axis=1
+            )
+        else:
+            self._matrix = np.zeros((MINUTES_PER_WEEK, 0), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.schedules)
+
+    def matching(self, dt: datetime) -> List[ProgramSchedule]:
+        """All schedules firing in the minute of dt"""
+        if dt.second >= 5:
+            return []
+        candidates = np.flatnonzero(self._matrix[week_minute(dt)])
+        return [
+            self.schedules[i]
+            for i in candidates
+            if self.schedules[i].compiled.allows(dt)
+        ]
+
+    def candidates(self, day: date) -> "DayCandidates":
+        """Start times of every schedule that can fire on day"""
+        dow = (day.weekday() + 1) % 7
+        rows = self._matrix[dow * MINUTES_PER_DAY : (dow + 1) * MINUTES_PER_DAY]
+        midnight = np.datetime64(day, "m")
+        starts = []
+        for i in np.flatnonzero(rows.any(axis=0)):
+            schedule = self.schedules[i]
+            minutes = (schedule.occurrences(day, day) - midnight).astype(np.int64)
+            starts.extend((int(m), int(i)) for m in minutes)
+        starts.sort()
+        return DayCandidates(day, [(m, self.schedules[i]) for m, i in starts])
+
+
+class DayCandidates:
+    """
+    Start minutes of the schedules able to fire on one day, in time order.
+    Checking a minute only looks at the entries from the cursor onwards
+    """
+
+    def __init__(self, day: date, starts: List[Tuple[int, ProgramSchedule]]):
+        self.day = day
+        self._minutes = [m for m, _ in starts]
+        self._schedules = [s for _, s in starts]
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._minutes)
+
+    @property
+    def next_start(self) -> Optional[datetime]:
+        if self._pos >= len(self._minutes):
+            return None
+        return datetime.combine(self.day, datetime.min.time()) + timedelta(
+            minutes=self._minutes[self._pos]
+        )
+
+    def due(self, dt: datetime) -> List[ProgramSchedule]:
+        """Schedules starting in the minute of dt"""
+        if dt.date() != self.day or dt.second >= 5:
+            return []
+        minute = dt.hour * 60 + dt.minute
+        if self._pos < len(self._minutes) and self._minutes[self._pos] > minute:
+            return []
+        pos = bisect_left(self._minutes, minute, lo=self._pos)
+        end = bisect_right(self._minutes, minute, lo=pos)
+        self._pos = end
+        return self._schedules[pos:end]
@@ -1,9 +1,15 @@
 from datetime import date, datetime, time, timedelta
 from enum import Enum
-from typing import Union, Optional
+from typing import Union, Optional, List, Dict, Tuple
+
+import numpy as np
 
 from openwater.errors import ScheduleException
 
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+OCCURRENCE_CACHE_SIZE = 16
+
 
 def to_date(d: Union[str, date]) -> date:
     if isinstance(d, str):
@@ -11,6 +17,12 @@ def to_date(d: Union[str, date]) -> date:
     return d
 
 
+def week_minute(dt: datetime) -> int:
+    """Minute of the week, starting Sunday 00:00 to match dow_mask"""
+    dow = (dt.weekday() + 1) % 7
+    return dow * MINUTES_PER_DAY + dt.hour * 60 + dt.minute
+
+
 class ScheduleType(Enum):
     WEEKLY = "Weekly"
     INTERVAL = "Interval"
@@ -58,6 +70,8 @@ class ProgramSchedule:
         self.start_day: date = to_date(start_day)
         self.repeat_every = repeat_every
         self.repeat_until = repeat_until
+        self.compiled = self.compile()
+        self._occurrences: Dict[Tuple[date, date], np.ndarray] = {}
 
     def to_dict(self) -> dict:
         return {
@@ -81,58 +95,173 @@ class ProgramSchedule:
         return self.to_dict()
 
     def matches(self, dt: datetime) -> bool:
+        return self.compiled.matches(dt)
+
+    def occurrences(self, start: date, end: date) -> np.ndarray:
+        """
+        Start times between start and end (inclusive) as datetime64[m]. Results
+        are cached on this instance, which the store replaces on every update
+        """
+        key = (start, end)
+        res = self._occurrences.get(key)
+        if res is None:
+            if len(self._occurrences) >= OCCURRENCE_CACHE_SIZE:
+                self._occurrences.clear()
+            res = self._occurrences[key] = self.compiled.occurrences(start, end)
+        return res
+
+    def compile(self) -> "CompiledSchedule":
+        """Precompute the minute-of-week bitmap and date rules for this schedule"""
+        week_mask = np.zeros(MINUTES_PER_WEEK, dtype=bool)
+        if self.at is None:
+            return CompiledSchedule(week_mask)
+
         if self.type == ScheduleType.WEEKLY:
-            return self._match_weekly(dt)
-        elif self.type == ScheduleType.INTERVAL:
-            return self._match_interval(dt)
-        elif self.type == ScheduleType.SINGLE:
-            return self._match_single(dt)
-        else:
-            raise ScheduleException("Unknown schedule type: {}".format(self.type))
-
-    def _match_weekly(self, dt: datetime) -> bool:
-        wd = dt.weekday()
-        dow = (wd + 1) % 7
-        dow_matches = (1 << dow) & self.dow_mask != 0
-
-        time_mins = (dt.hour * 60) + dt.minute
-        time_matches = time_mins == self.at and dt.second < 5
-
-        if (
-            time_matches is False
-            and self.repeat_every is not None
-            and self.repeat_until is not None
-            and self.repeat_until >= time_mins
-        ):
-            time_matches = self.at + self.repeat_every
-
-        even = dt.day % 2 == 0
-        if not self.days_restriction:
-            restricted = False
-        elif self.days_restriction == "E":
-            restricted = not even
-        else:
-            restricted = even
+            days = week_mask.reshape(7, MINUTES_PER_DAY)
+            for dow in range(7):
+                if (1 << dow) & (self.dow_mask or 0):
+                    days[dow, self._day_minutes()] = True
+            parity = None
+            if self.days_restriction:
+                # Any restriction other than even days means odd days
+                parity = 0 if self.days_restriction == "E" else 1
+            return CompiledSchedule(week_mask, parity=parity)
 
-        return dow_matches and time_matches and not restricted
+        if self.type == ScheduleType.INTERVAL:
+            if self.start_day is None:
+                return CompiledSchedule(week_mask)
+            if self.day_interval:
+                week_mask.reshape(7, MINUTES_PER_DAY)[:, self.at] = True
+                return CompiledSchedule(
+                    week_mask, anchor=self.start_day, day_interval=self.day_interval
+                )
+            if self.minute_interval:
+                week_mask[:] = True
+                first = datetime.combine(
+                    self.start_day, time(hour=self.at // 60, minute=self.at % 60)
+                )
+                return CompiledSchedule(
+                    week_mask, first=first, minute_interval=self.minute_interval
+                )
+            return CompiledSchedule(week_mask)
 
-    def _match_interval(self, dt: datetime) -> bool:
-        first = datetime.combine(
-            self.start_day, time(hour=self.at // 60, minute=self.at % 60)
-        )
-        diff = dt - first
+        if self.type == ScheduleType.SINGLE:
+            if self.on_day is None:
+                return CompiledSchedule(week_mask)
+            week_mask.reshape(7, MINUTES_PER_DAY)[:, self.at] = True
+            return CompiledSchedule(week_mask, on_day=self.on_day)
+
+        raise ScheduleException("Unknown schedule type: {}".format(self.type))
+
+    def _day_minutes(self) -> List[int]:
+        """Minutes of the day this schedule starts at, including repeats"""
+        minutes = [self.at]
+        if self.repeat_every and self.repeat_until is not None:
+            minutes.extend(
+                range(
+                    self.at + self.repeat_every,
+                    min(self.repeat_until, MINUTES_PER_DAY - 1) + 1,
+                    self.repeat_every,
+                )
+            )
+        return [m for m in minutes if 0 <= m < MINUTES_PER_DAY]
+
+
+class CompiledSchedule:
+    """
+    A schedule reduced to a minute-of-week bitmap plus the date rules that
+    cannot be expressed weekly: even/odd days, day or minute intervals from an
+    anchor, and single dates. Matching a minute is a bit test followed by
+    at most one arithmetic rule
+    """
+
+    def __init__(
+        self,
+        week_mask: np.ndarray,
+        *,
+        parity: Optional[int] = None,  # 0 even, 1 odd day of month
+        anchor: Optional[date] = None,
+        day_interval: Optional[int] = None,
+        first: Optional[datetime] = None,
+        minute_interval: Optional[int] = None,
+        on_day: Optional[date] = None,
+    ):
+        self.week_mask = week_mask
+        self.parity = parity
+        self.anchor = anchor
+        self.day_interval = day_interval
+        self.first = first
+        self.minute_interval = minute_interval
+        self.on_day = on_day
+
+    def matches(self, dt: datetime) -> bool:
+        if dt.second >= 5 or not self.week_mask[week_minute(dt)]:
+            return False
+        return self.allows(dt)
+
+    def allows(self, dt: datetime) -> bool:
+        """Check the date rules for a minute whose bit is already set"""
+        if self.minute_interval:
+            diff = dt.replace(second=0, microsecond=0) - self.first
+            d_min = diff.days * MINUTES_PER_DAY + diff.seconds // 60
+            return d_min >= 0 and d_min % self.minute_interval == 0
+        return self.allows_day(dt.date())
+
+    def allows_day(self, d: date) -> bool:
+        if self.parity is not None and d.day % 2 != self.parity:
+            return False
         if self.day_interval:
-            time_mins = (dt.hour * 60) + dt.minute
-            time_matches = time_mins == self.at and dt.second < 5
-            d = diff.days
-            return time_matches and (d % self.day_interval == 0)
-        else:
-            d_min = (diff.days * 24 * 60) + (diff.seconds // 60)
-            d_sec = diff.seconds % 60
-            return d_min % self.minute_interval == 0 and d_sec < 5
+            days = (d - self.anchor).days
+            return days >= 0 and days % self.day_interval == 0
+        if self.on_day is not None:
+            return d == self.on_day
+        return True
+
+    def day_mask(self, days: np.ndarray) -> np.ndarray:
+        """Vectorized allows_day over a datetime64[D] array"""
+        mask = np.ones(days.shape, dtype=bool)
+        if self.parity is not None:
+            dom = (days - days.astype("datetime64[M]")).astype(np.int64) + 1
+            mask &= dom % 2 == self.parity
+        if self.day_interval:
+            diff = (days - np.datetime64(self.anchor, "D")).astype(np.int64)
+            mask &= (diff >= 0) & (diff % self.day_interval == 0)
+        elif self.on_day is not None:
+            mask &= days == np.datetime64(self.on_day, "D")
+        return mask
+
+    def occurrences(self, start: date, end: date) -> np.ndarray:
+        """All start times between start and end (inclusive) as datetime64[m]"""
+        days = np.arange(
+            np.datetime64(start, "D"),
+            np.datetime64(end, "D") + 1,
+            dtype="datetime64[D]",
+        )
+        if days.size == 0 or not self.week_mask.any():
+            return np.array([], dtype="datetime64[m]")
 
-    def _match_single(self, dt: datetime) -> bool:
-        time_mins = (dt.hour * 60) + dt.minute
-        time_matches = time_mins == self.at and dt.second < 5
+        if self.minute_interval:
+            first = np.datetime64(self.first, "m")
+            lo = max(days[0].astype("datetime64[m]"), first)
+            hi = (days[-1] + 1).astype("datetime64[m]")
+            skip = -(-(lo - first).astype(np.int64) // self.minute_interval)
+            return np.arange(
+                first + skip * self.minute_interval,
+                hi,
+                np.timedelta64(self.minute_interval, "m"),
+            )
 
-        return dt.day == self.on_day.day and time_matches
+        days = days[self.day_mask(days)]
+        # 1970-01-01 was a Thursday, dow 4 with Sunday as 0
+        dows = (days.astype(np.int64) + 4) % 7
+        week = self.week_mask.reshape(7, MINUTES_PER_DAY)
+        res = []
+        for dow in np.unique(dows):
+            minutes = np.flatnonzero(week[dow]).astype("timedelta64[m]")
+            if minutes.size == 0:
+                continue
+            start_of_day = days[dows == dow].astype("datetime64[m]")
+            res.append((start_of_day[:, None] + minutes[None, :]).ravel())
+        if not res:
+            return np.array([], dtype="datetime64[m]")
+        return np.sort(np.concatenate(res))
@@ -1,9 +1,11 @@
+from datetime import timedelta
 from typing import TYPE_CHECKING, List, Optional
 
 from cerberus.errors import ErrorList
 
 from openwater.constants import EVENT_SCHEDULE_STATE
 from openwater.errors import ScheduleValidationException
+from openwater.schedule.conflicts import DEFAULT_CONFLICT_DAYS, find_conflicts
 from openwater.schedule.helpers import (
     insert_schedule,
     update_schedule,
@@ -53,6 +55,7 @@ class ScheduleStore:
         if errors:
             raise ScheduleValidationException("Schedule failed validation", errors)
         schedule = ProgramSchedule(**data)
+        self.check_conflicts(schedule)
         id_ = await insert_schedule(self._ow, schedule.to_db())
         schedule.id = id_
         self.add(schedule)
@@ -64,12 +67,29 @@ class ScheduleStore:
             raise ScheduleValidationException("Schedule failed validation", errors)
 
         schedule = ProgramSchedule(**data)
+        self.check_conflicts(schedule)
         success = await update_schedule(self._ow, schedule.to_db())
         if not success:
             return False
         self.add(schedule)
         return True
 
+    def check_conflicts(self, schedule: ProgramSchedule) -> None:
+        """Reject schedules colliding with another, if enabled in config"""
+        config = (self._ow.config or {}).get("scheduler") or {}
+        if not config.get("reject_conflicts", False):
+            return
+        others = [s for s in self.all if s.id != schedule.id]
+        start = self._ow.clock.now().date()
+        end = start + timedelta(days=config.get("conflict_days", DEFAULT_CONFLICT_DAYS))
+        conflicts = find_conflicts(
+            self._ow, start, end, others + [schedule], involving=schedule
+        )
+        if conflicts:
+            raise ScheduleValidationException(
+                "Schedule conflicts with existing schedules", {"conflicts": conflicts}
+            )
+
     async def delete(self, schedule_id: int) -> bool:
         success = delete_schedule(self._ow, schedule_id)
         if not success:
@@ -1,60 +1,169 @@
 import logging
-from typing import TYPE_CHECKING, Optional
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 
-from openwater.constants import EVENT_TIMER_TICK_MIN, EVENT_PROGRAM_COMPLETED
-from openwater.program.model import BaseProgram
+import numpy as np
+
+from openwater.constants import (
+    EVENT_APP_STARTED,
+    EVENT_APP_STOPPING,
+    EVENT_TIMER_TICK_MIN,
+    EVENT_SCHEDULE_STATE,
+)
+from openwater.schedule.index import DayCandidates, ScheduleIndex
 from openwater.schedule.model import ProgramSchedule
+from openwater.utils.decorator import nonblocking
+from openwater.utils.state import StateFile, state_path
 
 if TYPE_CHECKING:
     from openwater.core import OpenWater, Event
 
 _LOGGER = logging.getLogger(__name__)
 
+STATE_FILE = "scheduler.json"
+
+MISSED_RUN = "run"
+MISSED_SKIP = "skip"
+MISSED_WINDOW = "window"
+DEFAULT_MISSED_POLICY = MISSED_SKIP
+DEFAULT_MISSED_WINDOW = 60  # minutes
+DEFAULT_STATE_INTERVAL = 15  # minutes
+
+
+def missed_occurrences(
+    schedules: Iterable[ProgramSchedule], after: datetime, until: datetime
+) -> List[Tuple[ProgramSchedule, datetime]]:
+    """
+    Latest start of each schedule in (after, until], oldest first. Occurrences
+    are expanded per schedule with the vectorised calendar, so the cost grows
+    with the number of days in the outage rather than the number of minutes
+    """
+    lo = np.datetime64(after.replace(second=0, microsecond=0), "m")
+    hi = np.datetime64(until.replace(second=0, microsecond=0), "m")
+    res = []
+    for schedule in schedules:
+        occurrences = schedule.occurrences(after.date(), until.date())
+        idx = np.searchsorted(occurrences, hi, side="right")
+        if idx and occurrences[idx - 1] > lo:
+            res.append((schedule, occurrences[idx - 1].astype(datetime)))
+    res.sort(key=lambda m: m[1])
+    return res
+
 
 class Scheduler:
     def __init__(self, ow: "OpenWater"):
         self.ow = ow
-        self.running_program: Optional[BaseProgram] = None
+        self._index: Optional[ScheduleIndex] = None
+        self._today: Optional[DayCandidates] = None
+        self.state: Optional[StateFile] = StateFile(state_path(STATE_FILE))
+        self._saved_at: Optional[datetime] = None
+        ow.bus.listen(EVENT_APP_STARTED, self.catch_up)
+        ow.bus.listen(EVENT_APP_STOPPING, self.stopping)
         ow.bus.listen(EVENT_TIMER_TICK_MIN, self.check_schedules)
-        ow.bus.listen(EVENT_PROGRAM_COMPLETED, self.program_complete)
+        ow.bus.listen(EVENT_SCHEDULE_STATE, self.schedules_changed)
 
-    async def check_schedules(self, event: "Event"):
-        if self.running_program is not None:
-            return
+    @property
+    def config(self) -> dict:
+        return (self.ow.config or {}).get("scheduler") or {}
+
+    @nonblocking
+    def schedules_changed(self, event: "Event") -> None:
+        self._index = None
+        self._today = None
+
+    @property
+    def index(self) -> ScheduleIndex:
+        if self._index is None:
+            self._index = ScheduleIndex(self.ow.schedules.store.all)
+            _LOGGER.debug("Rebuilt schedule index: %d schedules", len(self._index))
+        return self._index
+
+    def candidates(self, day: date) -> DayCandidates:
+        """Schedules that can fire on day, rebuilt at midnight or after changes"""
+        if self._today is None or self._today.day != day:
+            self._today = self.index.candidates(day)
+            _LOGGER.debug("%d schedule starts on %s", len(self._today), day)
+        return self._today
 
+    @nonblocking
+    def check_schedules(self, event: "Event"):
         dt = event.data["now"]
-        schedules = self.ow.schedules.store.all
-        run_schedule = None
-        for schedule in schedules:
-            _LOGGER.debug("Checking schedule %s", schedule.id)
-            if schedule.matches(dt):
-                run_schedule = schedule
-                break
-
-        if run_schedule is None:
+        matching = self.candidates(dt.date()).due(dt)
+        # Minutes with nothing due need no catch up, so they are only saved
+        # every state_interval minutes to spare the storage
+        interval = self.config.get("state_interval", DEFAULT_STATE_INTERVAL)
+        if (
+            matching
+            or self._saved_at is None
+            or dt - self._saved_at >= timedelta(minutes=interval)
+        ):
+            self._saved_at = dt
+            self.ow.add_job(self.save_state, dt)
+        if not matching:
             _LOGGER.debug("No schedules to run")
             return
 
-        self.running_program = self.ow.programs.store.get(run_schedule.program_id)
-        self.ow.fire_coroutine(
-            self.ow.programs.controller.run_program(self.running_program)
-        )
-        _LOGGER.debug(
-            "Running program: {} for schedule: {}".format(
-                self.running_program, run_schedule
+        for schedule in matching:
+            self.submit(schedule)
+
+    def submit(self, schedule: ProgramSchedule) -> None:
+        program = self.ow.programs.store.get(schedule.program_id)
+        if program is None:
+            _LOGGER.error(
+                "Schedule %d references missing program %d",
+                schedule.id,
+                schedule.program_id,
             )
+            return
+        _LOGGER.debug("Queueing program: %s for schedule: %s", program, schedule)
+        self.ow.programs.queue.submit(program, schedule.id)
+
+    def save_state(self, dt: datetime) -> None:
+        if self.state is None:
+            return
+        self.state.write(
+            {"last_minute": dt.replace(second=0, microsecond=0).isoformat()}
         )
 
-    def program_complete(self, event: "Event"):
-        program: BaseProgram = event.data["program"]
-        if program.id != self.running_program.pid:
-            _LOGGER.error("Completed program did not match running program")
+    @nonblocking
+    def stopping(self, event: "Event") -> None:
+        # Written in place, the loop stops right after this event
+        self.save_state(self.ow.clock.now())
 
-        self.running_program = None
+    def load_state(self) -> Optional[datetime]:
+        if self.state is None:
+            return None
+        state = self.state.read() or {}
+        try:
+            return datetime.fromisoformat(state["last_minute"])
+        except (KeyError, TypeError, ValueError):
+            return None
 
-    async def check_program_progress(self, event):
-        if self.running_program is None:
+    async def catch_up(self, event: "Event") -> None:
+        """Apply the missed schedule policy to starts missed while stopped"""
+        now = self.ow.clock.now()
+        last = await self.ow.add_job(self.load_state)
+        # The timer only evaluates whole minutes after this one
+        self._saved_at = now
+        self.ow.add_job(self.save_state, now)
+        if last is None or last >= now:
             return
 
-        event_data = event["data"]
-        now = event_data["now"]
+        policy = self.config.get("missed_policy", DEFAULT_MISSED_POLICY)
+        window = self.config.get("missed_window", DEFAULT_MISSED_WINDOW)
+        if policy == MISSED_SKIP:
+            _LOGGER.info("Missed schedule policy is skip, downtime since %s", last)
+            return
+        if policy == MISSED_WINDOW:
+            last = max(last, now - timedelta(minutes=window))
+        elif policy != MISSED_RUN:
+            _LOGGER.error("Unknown missed schedule policy: %s", policy)
+            return
+
+        for schedule, start in missed_occurrences(
+            self.ow.schedules.store.all, last, now
+        ):
+            _LOGGER.info(
+                "Running schedule %d late, missed start at %s", schedule.id, start
+            )
+            self.submit(schedule)
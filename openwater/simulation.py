@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import selectors
+from collections import defaultdict
+from concurrent.futures import Future
+from concurrent.futures.thread import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from openwater.clock import VirtualClock
+from openwater.constants import EVENT_APP_STARTED
+from openwater.core import OpenWater
+from openwater.database import model
+from openwater.errors import OWError
+from openwater.plugins import basic_program, cycle_soak
+from openwater.program.helpers import link_step_zones
+from openwater.program.model import ProgramStep
+from openwater.schedule.model import ProgramSchedule
+from openwater.zone.model import BaseZone
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SIMULATION = "SIMULATION"
+ZONE_TYPE_SIMULATED = "SIMULATED"
+
+SIMULATION_PLUGINS = [basic_program, cycle_soak]
+
+
+class SimulationException(OWError):
+    pass
+
+
+class ValveAction(NamedTuple):
+    time: datetime
+    zone_id: int
+    zone_name: str
+    open: bool
+
+    def __str__(self) -> str:
+        return "{} {:<5} {:>3} {}".format(
+            self.time.isoformat(),
+            "open" if self.open else "close",
+            self.zone_id,
+            self.zone_name,
+        )
+
+
+class _VirtualTimeSelector(selectors.DefaultSelector):
+    """
+    Polls without blocking. When nothing is ready, the loop's virtual time jumps
+    forward by the timeout instead of waiting for it
+    """
+
+    def __init__(self, loop: "VirtualTimeEventLoop"):
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            raise SimulationException("Simulation stalled: nothing left to run")
+        self._loop.advance(timeout)
+        return events
+
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Runs executor jobs immediately on the calling thread"""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose clock only advances when every task is waiting on a timer.
+    Executor jobs run inline so no work happens outside of virtual time
+    """
+
+    def __init__(self):
+        self._time = 0.0
+        super().__init__(_VirtualTimeSelector(self))
+        self.set_default_executor(InlineExecutor())
+
+    def time(self) -> float:
+        return self._time
+
+    def advance(self, secs: float) -> None:
+        self._time += secs
+
+
+class SimulatedZone(BaseZone):
+    """Zone without hardware that records every valve change"""
+
+    def __init__(self, ow: "OpenWater", **kwargs):
+        super().__init__(ow=ow, **kwargs)
+        self._open = False
+        self._timeline: List[ValveAction] = ow.data[DATA_SIMULATION]
+
+    def is_open(self) -> bool:
+        return self._open
+
+    async def open(self) -> None:
+        self._set(True)
+
+    async def close(self) -> None:
+        self._set(False)
+
+    def _set(self, open_: bool) -> None:
+        if self._open == open_:
+            return
+        self._open = open_
+        self._timeline.append(
+            ValveAction(self._ow.clock.now(), self.id, self.name, open_)
+        )
+
+    def get_zone_type(self) -> str:
+        return ZONE_TYPE_SIMULATED
+
+
+async def load_simulation_data(ow: "OpenWater") -> Dict[str, List[dict]]:
+    """Read everything a simulation needs from the database"""
+    tables = {
+        "zones": model.zone,
+        "masters": model.master_zone_join,
+        "programs": model.program,
+        "steps": model.program_step,
+        "step_zones": model.program_step_zones,
+        "schedules": model.schedule,
+    }
+    return {
+        key: [dict(row) for row in await ow.db.list(table)]
+        for key, table in tables.items()
+    }
+
+
+class Simulation:
+    """
+    Runs the real scheduler, run queue, program controller and zone controller
+    against a virtual clock and simulated zones, as fast as the CPU allows
+    """
+
+    def __init__(self, data: Dict[str, List[dict]], config: Optional[dict] = None):
+        self.data = data
+        self.config = config or {}
+        self.timeline: List[ValveAction] = []
+
+    def run(self, start: datetime, days: float) -> List[ValveAction]:
+        """Simulate `days` days from `start` and return the valve timeline"""
+        loop = VirtualTimeEventLoop()
+        asyncio.set_event_loop(loop)
+        try:
+            ow = OpenWater(clock=VirtualClock(start, loop))
+            ow.config = self.config
+            ow.data[DATA_SIMULATION] = self.timeline
+            ow.scheduler.state = None
+            ow.programs.controller.state = None
+            self._populate(ow)
+            loop.call_soon(ow.bus.fire, EVENT_APP_STARTED)
+            loop.run_until_complete(asyncio.sleep(days * 24 * 60 * 60))
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            asyncio.set_event_loop(None)
+            loop.close()
+        return self.timeline
+
+    def _populate(self, ow: "OpenWater") -> None:
+        for plugin in SIMULATION_PLUGINS:
+            plugin.setup_plugin(ow, {})
+
+        for row in self.data["zones"]:
+            ow.zones.store.add(SimulatedZone.of(ow, row))
+        for row in self.data["masters"]:
+            zone = ow.zones.store.get(row["zone_id"])
+            master = ow.zones.store.get(row["master_zone_id"])
+            if zone.master_zones is None:
+                zone.master_zones = []
+            zone.master_zones.append(master)
+
+        steps = [ProgramStep(**row) for row in self.data["steps"]]
+        ow.programs.store.set_steps(steps)
+        for step in steps:
+            link_step_zones(
+                ow,
+                step,
+                (
+                    row["zone_id"]
+                    for row in self.data["step_zones"]
+                    if row["step_id"] == step.id
+                ),
+            )
+        for row in self.data["programs"]:
+            program_type = ow.programs.registry.get_program_for_type(
+                row["program_type"]
+            )
+            if program_type is None:
+                _LOGGER.warning(
+                    "Program type %s is not available in simulations",
+                    row["program_type"],
+                )
+                continue
+            program = program_type.create(ow, row)
+            program.steps = [s for s in steps if s.program_id == program.id]
+            ow.programs.store.add(program)
+
+        for row in self.data["schedules"]:
+            ow.schedules.store.add(ProgramSchedule(**row))
+
+
+def summarize(timeline: List[ValveAction]) -> Dict[int, timedelta]:
+    """Total open time per zone"""
+    opened: Dict[int, datetime] = {}
+    res: Dict[int, timedelta] = defaultdict(timedelta)
+    for action in timeline:
+        if action.open:
+            opened[action.zone_id] = action.time
+        elif action.zone_id in opened:
+            res[action.zone_id] += action.time - opened.pop(action.zone_id)
+    return dict(res)
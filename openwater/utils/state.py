@@ -0,0 +1,58 @@
+import contextlib
+import json
+import logging
+import os
+import tempfile
+from typing import Optional
+
+from openwater.config import get_default_config_dir
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_DIR = "state"
+
+
+def state_path(name: str) -> str:
+    return os.path.join(get_default_config_dir(), STATE_DIR, name)
+
+
+class StateFile:
+    """
+    Small JSON document persisted across restarts. Writes go to a temporary file
+    which is fsynced and renamed over the old one, so a crash or power loss
+    leaves either the previous or the new state, never a partial file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            _LOGGER.error("Unable to read state file %s: %s", self.path, e)
+            return None
+
+    def write(self, data: dict) -> None:
+        # Every write has a temporary file of its own, so concurrent writes
+        # can not replace each other's partial file
+        tmp = None
+        try:
+            dirname = os.path.dirname(self.path)
+            os.makedirs(dirname, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(
+                dir=dirname, prefix=os.path.basename(self.path) + ".", suffix=".tmp"
+            )
+            with open(fd, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            _LOGGER.error("Unable to write state file %s: %s", self.path, e)
+            if tmp is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp)
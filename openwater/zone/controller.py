@@ -1,62 +1,220 @@
 import logging
 from asyncio import TimerHandle
-from typing import TYPE_CHECKING, Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Hashable, Iterable, List, Set, Type
 
 from openwater.constants import EVENT_ZONE_STATE
+from openwater.utils.decorator import nonblocking
 from openwater.zone.model import BaseZone
 
 if TYPE_CHECKING:
     from openwater.core import OpenWater
+    from openwater.zone.store import ZoneStore
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def zone_holder(zone_id: int) -> str:
+    """Lease holder for master zones opened along with a zone"""
+    return "zone:{}".format(zone_id)
+
+
+def _by_type(zones: Iterable["BaseZone"]) -> Dict[Type["BaseZone"], List["BaseZone"]]:
+    res: Dict[Type["BaseZone"], List["BaseZone"]] = {}
+    for zone in zones:
+        res.setdefault(type(zone), []).append(zone)
+    return res
+
+
 class ZoneController:
+    """
+    Opens and closes zones. Master zones are leased: every consumer holding a
+    master (a zone opened on its own, or a running program) is recorded, and
+    the master valve is only opened when the first lease is taken and closed
+    when the last one is released
+    """
+
     def __init__(self, ow: "OpenWater", store: "ZoneStore"):
         self._ow = ow
         self._store = store
         self.zone_types: Dict[str, Dict] = dict()
         self.zones: Dict[int, BaseZone] = dict()
         self._zone_open_jobs: Dict[int, Dict[int, TimerHandle]] = dict()
+        self._leases: Dict[int, Set[Hashable]] = dict()
+        self._pending_close: Dict[int, TimerHandle] = dict()
+
+    def to_dict(self) -> dict:
+        return {
+            "leases": {
+                master_id: sorted(str(h) for h in holders)
+                for master_id, holders in self._leases.items()
+            }
+        }
 
-    async def open_zone(self, zone_id: int):
+    def holders(self, master_id: int) -> Set[Hashable]:
+        return set(self._leases.get(master_id, ()))
+
+    async def open_zone(self, zone_id: int, open_master: bool = True):
+        """
+        Open a zone. Unless open_master is False, its masters are leased for
+        the zone first, and the zone waits for the open offset of any master
+        that was closed
+        """
         target: "BaseZone" = self._store.get(zone_id)
         if target is None:
             _LOGGER.error("Requested to open a non-existent zone: %d", zone_id)
             return
-        for m_id, job in self._zone_open_jobs.get(target.id, {}).values():
-            if job and not job.cancelled():
-                job.cancel()
-                self._zone_open_jobs[target.id].pop(m_id)
-        if not target.master_zones:
+        self._cancel_open_jobs(target.id)
+        holder = zone_holder(target.id)
+        if target.is_master:
+            await self.acquire_master(target.id, holder)
+            return
+        masters = []
+        for master in (target.master_zones or []) if open_master else []:
+            if self._leases.get(master.id) or master.is_open():
+                await self.acquire_master(master.id, holder)
+            else:
+                masters.append(master)
+        if not masters:
             await target.open()
         else:
-            masters = sorted(
-                [mz for mz in target.master_zones if not mz.is_open()],
-                key=lambda z: z.open_offset,
-                reverse=True,
-            )
-            master_zero = masters[0]
+            lead = max(master.open_offset or 0 for master in masters)
+            jobs = self._zone_open_jobs.setdefault(target.id, dict())
             for master in masters:
-                if self._zone_open_jobs.get(target.id) is None:
-                    self._zone_open_jobs[target.id] = dict()
-                self._zone_open_jobs[target.id][master.id] = self._ow.run_coroutine_in(
-                    master.open(), master_zero.open_offset - master.open_offset
-                )
-                self._zone_open_jobs[target.id][target.id] = self._ow.run_coroutine_in(
-                    target.open(), master_zero.open_offset
+                jobs[master.id] = self._ow.event_loop.call_later(
+                    lead - (master.open_offset or 0),
+                    self._acquire_later,
+                    master.id,
+                    holder,
                 )
+            jobs[target.id] = self._ow.run_coroutine_in(target.open(), lead)
         _LOGGER.debug("Opened zone %d", zone_id)
 
+    async def open_zones(self, zone_ids: Iterable[int], open_master: bool = True):
+        """
+        Open several zones, switching zones of the same type together. Zones
+        that wait for the open offset of a closed master are opened on their own
+        """
+        ready = []
+        for zone_id in zone_ids:
+            target: "BaseZone" = self._store.get(zone_id)
+            if target is None:
+                _LOGGER.error("Requested to open a non-existent zone: %d", zone_id)
+                continue
+            masters = (target.master_zones or []) if open_master else []
+            if target.is_master or any(
+                master.open_offset
+                and not (self._leases.get(master.id) or master.is_open())
+                for master in masters
+            ):
+                await self.open_zone(zone_id, open_master)
+                continue
+            self._cancel_open_jobs(target.id)
+            for master in masters:
+                await self.acquire_master(master.id, zone_holder(target.id))
+            ready.append(target)
+        for zone_type, zones in _by_type(ready).items():
+            await zone_type.open_many(zones)
+        if ready:
+            _LOGGER.debug("Opened zones %s", [z.id for z in ready])
+
     async def close_zone(self, zone_id: int, close_master: bool = True):
-        target = self._store.get(zone_id)
-        if target is None:
-            _LOGGER.error("Requested to close a non-existent zone: %d", zone_id)
+        """
+        Close a zone. Unless close_master is False, the zone's leases on its
+        masters are released, each master closing after its close offset once
+        nothing else holds it. Closing a master zone directly drops all leases
+        """
+        await self.close_zones([zone_id], close_master)
+
+    async def close_zones(self, zone_ids: Iterable[int], close_master: bool = True):
+        """Close several zones, switching zones of the same type together"""
+        targets = []
+        for zone_id in zone_ids:
+            target = self._store.get(zone_id)
+            if target is None:
+                _LOGGER.error("Requested to close a non-existent zone: %d", zone_id)
+                continue
+            self._cancel_open_jobs(target.id)
+            if self._leases.pop(target.id, None):
+                _LOGGER.warning("Closing master zone %d while leased", target.id)
+            self._cancel_pending_close(target.id)
+            targets.append(target)
+        for zone_type, zones in _by_type(targets).items():
+            await zone_type.close_many(zones)
+        for target in targets:
+            _LOGGER.debug("Closed zone %d", target.id)
+            self._ow.bus.fire(EVENT_ZONE_STATE, target)
+        if not close_master:
             return
-        for m_id, job in self._zone_open_jobs.get(target.id, {}).values():
+        for target in targets:
+            for master in target.master_zones or []:
+                await self.release_master(
+                    master.id, zone_holder(target.id), master.close_offset or 0
+                )
+
+    async def acquire_master(self, master_id: int, holder: Hashable) -> None:
+        """Lease a master zone, opening it if nothing held it"""
+        holders = self._leases.setdefault(master_id, set())
+        first = not holders
+        holders.add(holder)
+        if self._cancel_pending_close(master_id) or not first:
+            return
+        master = self._store.get(master_id)
+        if master is None:
+            _LOGGER.error("Requested to open a non-existent master: %d", master_id)
+            return
+        if not master.is_open():
+            await master.open()
+            _LOGGER.debug("Opened master zone %d for %s", master_id, holder)
+            self._ow.bus.fire(EVENT_ZONE_STATE, master)
+
+    async def release_master(
+        self, master_id: int, holder: Hashable, delay: float = 0
+    ) -> None:
+        """
+        Release a lease on a master zone. When it was the last one the master
+        closes, after delay seconds unless it is leased again in the meantime
+        """
+        holders = self._leases.get(master_id)
+        if not holders or holder not in holders:
+            return
+        holders.discard(holder)
+        if holders:
+            return
+        del self._leases[master_id]
+        if delay > 0:
+            self._pending_close[master_id] = self._ow.event_loop.call_later(
+                delay, self._close_later, master_id
+            )
+        else:
+            await self._close_master(master_id)
+
+    @nonblocking
+    def _acquire_later(self, master_id: int, holder: Hashable) -> None:
+        self._ow.fire_coroutine(self.acquire_master(master_id, holder))
+
+    @nonblocking
+    def _close_later(self, master_id: int) -> None:
+        self._pending_close.pop(master_id, None)
+        self._ow.fire_coroutine(self._close_master(master_id))
+
+    async def _close_master(self, master_id: int) -> None:
+        if self._leases.get(master_id):
+            return
+        master = self._store.get(master_id)
+        if master is None:
+            return
+        await master.close()
+        _LOGGER.debug("Closed master zone %d", master_id)
+        self._ow.bus.fire(EVENT_ZONE_STATE, master)
+
+    def _cancel_pending_close(self, master_id: int) -> bool:
+        handle = self._pending_close.pop(master_id, None)
+        if handle is None:
+            return False
+        handle.cancel()
+        return True
+
+    def _cancel_open_jobs(self, zone_id: int) -> None:
+        for job in self._zone_open_jobs.pop(zone_id, {}).values():
             if job and not job.cancelled():
                 job.cancel()
-                self._zone_open_jobs[target.id].pop(m_id)
-        await target.close()
-        _LOGGER.debug("Closed zone %d", zone_id)
-        self._ow.bus.fire(EVENT_ZONE_STATE, target)
@@ -4,7 +4,7 @@ from typing import TYPE_CHECKING, Optional, List
 from sqlalchemy import desc, select
 
 from openwater.database.model import zone, zone_run, master_zone_join
-from openwater.errors import OWError
+from openwater.errors import OWError, ZoneValidationException
 from openwater.zone.model import ZoneRun, BaseZone
 
 if TYPE_CHECKING:
@@ -25,7 +25,11 @@ async def load_zones(ow: "OpenWater"):
         zone_type = ow.zones.registry.get_zone_for_type(zone_["zone_type"])
         if zone_type is None:
             continue
-        z = zone_type.create(ow, zone_)
+        try:
+            z = zone_type.create(ow, zone_)
+        except ZoneValidationException as e:
+            _LOGGER.error("Skipping invalid zone %d: %s", zone_["id"], e.errors)
+            continue
         z.last_run = await load_last_run(ow, z.id)
         ow.zones.store.add(z)
 
@@ -39,6 +43,8 @@ async def load_masters(ow: "OpenWater") -> None:
     for row in rows:
         zone_ = ow.zones.store.get(row[0])
         master_ = ow.zones.store.get(row[1])
+        if zone_ is None or master_ is None:
+            continue
         if zone_.master_zones is None:
             zone_.master_zones = [master_]
         else:
@@ -48,6 +48,7 @@ class BaseZone(ABC):
         self.close_offset = close_offset
         self.last_run = last_run
         self.master_zones: Optional[List[BaseZone]] = None
+        self.next_run: Optional[dict] = None
 
     @classmethod
     def of(cls, ow: "OpenWater", data: Dict[str, Any]):
@@ -73,6 +74,7 @@ class BaseZone(ABC):
             "open": self.is_open(),
             "attrs": dict(self.attrs, **self.extra_attrs),
             "last_run": self.last_run,
+            "next_run": self.next_run,
             "master_zones": self.master_zones,
         }
 
@@ -102,10 +104,33 @@ class BaseZone(ABC):
     def get_zone_type(self) -> str:
         pass
 
+    @classmethod
+    async def open_many(cls, zones: List["BaseZone"]) -> None:
+        """
+        Open several zones of this type. Zone types driving many valves from
+        one device can override this to switch them in a single write
+        """
+        for zone in zones:
+            await zone.open()
+
+    @classmethod
+    async def close_many(cls, zones: List["BaseZone"]) -> None:
+        """Close several zones of this type, see open_many"""
+        for zone in zones:
+            await zone.close()
+
     @property
     def extra_attrs(self) -> dict:
         return {}
 
+    @classmethod
+    def check_attrs(cls, ow: "OpenWater", attrs: dict) -> Optional[dict]:
+        """
+        Errors in attrs that depend on the running configuration rather than
+        on ATTR_SCHEMA, None when they are valid
+        """
+        return None
+
     def __eq__(self, other):
         return self.id == other.id
 
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Dict, Optional
 
-from openwater.constants import EVENT_ZONE_STATE
+from openwater.constants import EVENT_ZONE_STATE, EVENT_ZONE_UPDATED
 from openwater.errors import ZoneException, ZoneValidationException
 from openwater.zone.helpers import insert_zone, update_zone, delete_zone
 from openwater.zone.model import BaseZone
@@ -43,6 +43,8 @@ class ZoneStore:
             raise ZoneValidationException("Zone validation failed", errors)
         zone_type = self._registry.get_zone_for_type(data["zone_type"])
         errors = {"attrs": validate_attrs(zone_type.cls, data["attrs"])}
+        if not errors["attrs"]:
+            errors["attrs"] = zone_type.cls.check_attrs(self._ow, data["attrs"])
         if errors["attrs"]:
             raise ZoneValidationException("Zone attribute validation failed", errors)
         id_ = await insert_zone(self._ow, data)
@@ -51,6 +53,7 @@ class ZoneStore:
         self.zones_[zone.id] = zone
 
         self._ow.bus.fire(EVENT_ZONE_STATE, zone)
+        self._ow.bus.fire(EVENT_ZONE_UPDATED, zone)
         return zone
 
     async def update(self, data: Dict) -> BaseZone:
@@ -61,6 +64,8 @@ class ZoneStore:
 
         zone_type = self._registry.get_zone_for_type(data["zone_type"])
         errors = validate_attrs(zone_type.cls, data["attrs"])
+        if not errors:
+            errors = zone_type.cls.check_attrs(self._ow, data["attrs"])
         if errors:
             raise ZoneValidationException("Zone validation failed", errors)
 
@@ -68,9 +73,16 @@ class ZoneStore:
         zone = zone_type.create(self._ow, data)
         zone_ = self.get(data["id"])
         zone.last_run = zone_.last_run
+        zone.master_zones = zone_.master_zones
         self.zones_[zone.id] = zone
+        for other in self.zones_.values():
+            if other.master_zones and zone_ in other.master_zones:
+                other.master_zones = [
+                    zone if mz is zone_ else mz for mz in other.master_zones
+                ]
 
         self._ow.bus.fire(EVENT_ZONE_STATE, zone)
+        self._ow.bus.fire(EVENT_ZONE_UPDATED, zone)
         return zone
 
     async def delete(self, zone_id: int) -> int:
@@ -78,4 +90,5 @@ class ZoneStore:
         result = await delete_zone(self._ow, zone_id)
         self.remove(self.get(zone_id))
         self._ow.bus.fire(EVENT_ZONE_STATE, {"zone_id": zone_id})
+        self._ow.bus.fire(EVENT_ZONE_UPDATED, {"zone_id": zone_id})
         return result
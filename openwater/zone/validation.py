@@ -9,6 +9,7 @@ from openwater.zone.model import BaseZone
 ATTR_SCHEMA = {
     "soil_type": {"type": "string"},
     "precip_rate": {"type": "float"},
+    "flow_rate": {"type": "number", "nullable": True},
 }
 
 RUN_SCHEMA = {